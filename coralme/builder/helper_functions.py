@@ -5,9 +5,11 @@ import sys
 import copy
 import json
 
+import time
 import logging
 log = logging.getLogger(__name__)
 
+import numpy
 import sympy
 import pandas
 import tqdm
@@ -342,59 +344,265 @@ def find_match(d,items):
 
 # Originally developed by JDTB@UCSD, 2022
 # Modified by RSP@UCSD, 2022
+def get_stoichiometric_pattern(model, growth_key = sympy.Symbol('mu', positive = True), mu = 1.):
+	"""
+	Return the signed sparsity pattern of the stoichiometric matrix and the
+	bound-direction masks of the reactions, with 'growth_key' replaced by mu.
+
+	Returns a dictionary with:
+		metabolites, reactions: lists of identifiers (rows and columns)
+		row, col, sign: entries of the matrix, sign is +1 or -1
+		fwd, rev: reactions with upper bound > 0 and lower bound < 0
+		keep_met: metabolites considered by the deadend analysis
+		keep_rxn: reactions considered by the deadend analysis
+		balanced: metabolites whose deadend status forces their reactions to zero
+	"""
+	if isinstance(model, coralme.core.model.MEModel):
+		compiled = model._compile_lp()
+		atoms = set(compiled['S'].atoms)
+	else:
+		compiled = None
+
+	if compiled is not None and atoms.issubset({ growth_key }):
+		# the LP kept by the ME-model, shared with the solvers
+		template = compiled['S']
+		m, n = template.shape
+		row = template.indices.astype(numpy.int64)
+		col = numpy.repeat(numpy.arange(n, dtype = numpy.int64), numpy.diff(template.indptr))
+		values = template.evaluate(mu)
+		# the template drops explicit zeros
+		zeros = [ k for k,v in model._lp_cache['Sf'].items() if v == 0 ]
+		if zeros:
+			row = numpy.concatenate([ row, numpy.array([ k[0] for k in zeros ], dtype = numpy.int64) ])
+			col = numpy.concatenate([ col, numpy.array([ k[1] for k in zeros ], dtype = numpy.int64) ])
+			values = numpy.concatenate([ values, numpy.zeros(len(zeros)) ])
+		lb = compiled['lb'].evaluate(mu)
+		ub = compiled['ub'].evaluate(mu)
+	else:
+		from coralme.solver.template import GrowthRateTemplate
+		met_index = { met.id:idx for idx, met in enumerate(model.metabolites) }
+		row, col, values = [], [], []
+		for idx, rxn in enumerate(model.reactions):
+			for met, value in rxn.metabolites.items():
+				row.append(met_index[met.id])
+				col.append(idx)
+				values.append(value)
+		row = numpy.array(row, dtype = numpy.int64)
+		col = numpy.array(col, dtype = numpy.int64)
+		values = GrowthRateTemplate(values, [ growth_key ]).evaluate(mu)
+		lb = GrowthRateTemplate(model.reactions.list_attr('lower_bound'), [ growth_key ]).evaluate(mu)
+		ub = GrowthRateTemplate(model.reactions.list_attr('upper_bound'), [ growth_key ]).evaluate(mu)
+
+	metabolites = [ met.id for met in model.metabolites ]
+	reactions = [ rxn.id for rxn in model.reactions ]
+
+	types = (cobra.core.metabolite.Metabolite, coralme.core.component.Metabolite)
+	keep_met = numpy.array([ type(met) in types and not met.id.startswith('trna') and not met.id.endswith('trna_c') for met in model.metabolites ], dtype = bool)
+	keep_rxn = numpy.array([ not x.startswith('BIOMASS_') for x in reactions ], dtype = bool)
+
+	# metabolites in the biomass reactions or with accumulation do not block reactions
+	balanced = keep_met & numpy.array([ isinstance(getattr(met, '_bound', 0), (int, float)) and getattr(met, '_bound', 0) == 0 for met in model.metabolites ], dtype = bool)
+	balanced[row[~keep_rxn[col]]] = False
+
+	return {
+		'metabolites' : metabolites,
+		'reactions' : reactions,
+		'row' : row,
+		'col' : col,
+		'sign' : numpy.where(values > 0, 1, -1),
+		'fwd' : ub > 0,
+		'rev' : lb < 0,
+		'keep_met' : keep_met,
+		'keep_rxn' : keep_rxn,
+		'balanced' : balanced,
+		}
+
+def _get_gap_flags(pattern, active):
+	# entries of producing and consuming reactions, and p/c/u flags per metabolite
+	row, col, sign = pattern['row'], pattern['col'], pattern['sign']
+	fwd = (pattern['fwd'] & active)[col]
+	rev = (pattern['rev'] & active)[col]
+	entries = pattern['keep_rxn'][col] & pattern['keep_met'][row]
+	cons = entries & (((sign < 0) & fwd) | ((sign > 0) & rev))
+	prod = entries & (((sign > 0) & fwd) | ((sign < 0) & rev))
+
+	m = len(pattern['metabolites'])
+	ncons = numpy.bincount(row[cons], minlength = m)
+	nprod = numpy.bincount(row[prod], minlength = m)
+	# the reaction of metabolites with a single consumer or producer
+	ccol = numpy.full(m, -1, dtype = numpy.int64)
+	ccol[row[cons]] = col[cons]
+	pcol = numpy.full(m, -1, dtype = numpy.int64)
+	pcol[row[prod]] = col[prod]
+
+	flags = {
+		'p' : (nprod == 0) & pattern['keep_met'],
+		'c' : (ncons == 0) & pattern['keep_met'],
+		'u' : (ncons == 1) & (nprod == 1) & (ccol == pcol) & pattern['keep_met'],
+		}
+	return cons, prod, flags
+
 def process_model(model, growth_key = sympy.Symbol('mu', positive = True)):
-	dct = {}
-	for met in model.metabolites:
-		filter1 = type(met) == cobra.core.metabolite.Metabolite or type(met) == coralme.core.component.Metabolite
-		filter2 = met.id.startswith('trna')
-		filter3 = met.id.endswith('trna_c')
-
-		if filter1 and not filter2 and not filter3:
-			t = { 'c' : set(), 'p' : set() }
-			#seen = [] #?
-			for rxn in met.reactions:
-				if rxn.id.startswith('BIOMASS_'):
-					continue
-
-				lb, ub = rxn.lower_bound, rxn.upper_bound
-
-				# Replace 'growth_key' if model is a ME-model
-				if hasattr(lb, 'subs'):
-					lb = lb.subs(growth_key, 1.)
-				if hasattr(ub, 'subs'):
-					ub = ub.subs(growth_key, 1.)
-
-				coeff = rxn.metabolites[met]
-				if hasattr(coeff, 'subs'):
-					coeff = coeff.subs(growth_key, 1.)
-
-				pos = 1 if coeff > 0 else -1
-				rev = 1 if lb < 0 else 0
-				fwd = 1 if ub > 0 else 0
-				if pos*fwd == -1 or pos*rev == +1:
-					t['c'].add(rxn.id)
-				if pos*fwd == +1 or pos*rev == -1:
-					t['p'].add(rxn.id)
-			dct[met.id] = t
+	pattern = get_stoichiometric_pattern(model, growth_key = growth_key)
+	cons, prod, flags = _get_gap_flags(pattern, pattern['keep_rxn'].copy())
+
+	row, col = pattern['row'], pattern['col']
+	mets, rxns = pattern['metabolites'], pattern['reactions']
+	dct = { mets[idx] : { 'c' : set(), 'p' : set() } for idx in numpy.where(pattern['keep_met'])[0] }
+	for idx, jdx in zip(row[cons], col[cons]):
+		dct[mets[idx]]['c'].add(rxns[jdx])
+	for idx, jdx in zip(row[prod], col[prod]):
+		dct[mets[idx]]['p'].add(rxns[jdx])
 	return dct
 
-def find_gaps(model, growth_key = sympy.Symbol('mu', positive = True)):
-	g = {}
-	dct = process_model(model, growth_key = growth_key)
-	for met, t in dct.items():
-		# not producing, not consuming, not uerever
-		g[met] = { 'p' : 0, 'c' : 0, 'u' : 0 }
-		if not t['c']:
-			g[met]['c'] = 1
-		if not t['p']:
-			g[met]['p'] = 1
-		if len(t['c']) == 1 and t['c'] == t['p']:
-			g[met]['u'] = 1
-	df = pandas.DataFrame.from_dict(g).T
-	df = df[df.any(axis = 1)]
+def _get_blocked(pattern):
+	# fixed point of removing the reactions of balanced deadends
+	row, col = pattern['row'], pattern['col']
+
+	active = pattern['keep_rxn'].copy()
+	met_order = numpy.full(len(pattern['metabolites']), -1, dtype = numpy.int64)
+	rxn_order = numpy.full(len(pattern['reactions']), -1, dtype = numpy.int64)
+
+	iteration = 0
+	while True:
+		cons, prod, flags = _get_gap_flags(pattern, active)
+		deadends = flags['p'] | flags['c'] | flags['u']
+		met_order[deadends & (met_order < 0)] = iteration
+
+		blocking = (deadends & pattern['balanced'])[row] & active[col]
+		if not blocking.any():
+			break
+		blocked = numpy.unique(col[blocking])
+		active[blocked] = False
+		rxn_order[blocked] = iteration
+		iteration += 1
+
+	return active, met_order, rxn_order
+
+def get_blocked(model, growth_key = sympy.Symbol('mu', positive = True), mu = 1.):
+	"""
+	Find metabolites and reactions blocked at steady state from the signed
+	sparsity pattern of the stoichiometric matrix.
+
+	A balanced metabolite that cannot be produced, cannot be consumed, or is
+	used by a single reversible reaction (p/c/u deadends) forces all its
+	reactions to zero flux. Removing those reactions creates new deadends,
+	and the analysis is repeated until no more reactions are blocked.
+
+	Returns two dictionaries, { metabolite ID : iteration } and
+	{ reaction ID : iteration }, with the iteration (from 0) at which each
+	metabolite was found as a deadend or each reaction was blocked. Signs of
+	coefficients and bounds are those at growth rate mu.
+	"""
+	pattern = get_stoichiometric_pattern(model, growth_key = growth_key, mu = mu)
+	active, met_order, rxn_order = _get_blocked(pattern)
+
+	mets = { pattern['metabolites'][idx] : int(met_order[idx]) for idx in numpy.where(met_order >= 0)[0] }
+	rxns = { pattern['reactions'][idx] : int(rxn_order[idx]) for idx in numpy.where(rxn_order >= 0)[0] }
+	return mets, rxns
+
+def find_gaps(model, growth_key = sympy.Symbol('mu', positive = True), fixed_point = False):
+	"""
+	Return a table of deadend metabolites with flags 'p' (not produced),
+	'c' (not consumed) and 'u' (used by a single reversible reaction).
+
+	If fixed_point is True, reactions blocked by deadends are removed until
+	no new deadends are found (see `get_blocked`). The flags are those at the
+	fixed point, and the column 'order' records the iteration at which each
+	metabolite became a deadend.
+	"""
+	pattern = get_stoichiometric_pattern(model, growth_key = growth_key)
+
+	if fixed_point:
+		active, met_order, rxn_order = _get_blocked(pattern)
+	else:
+		active = pattern['keep_rxn'].copy()
+	cons, prod, flags = _get_gap_flags(pattern, active)
+
+	keep = flags['p'] | flags['c'] | flags['u']
+	index = numpy.array(pattern['metabolites'], dtype = object)[keep]
+	df = pandas.DataFrame({ k:v[keep].astype(int) for k,v in flags.items() }, index = index, columns = [ 'p', 'c', 'u' ])
+	if fixed_point:
+		df['order'] = met_order[keep]
 	df = df.sort_index()
 	return df
 
+def get_fva_pruning(model, reactions, mu_fixed, growth_key = sympy.Symbol('mu', positive = True)):
+	"""
+	Identify reactions whose minimum and maximum fluxes can be settled
+	without solving LPs.
+
+	Returns two dictionaries:
+		fixed: { reaction id : {'maximum' : value, 'minimum' : value} } for
+			reactions with equal bounds (e.g., (0, 0)) and reactions blocked
+			by deadend metabolites
+		coupled: { reaction id : (representative reaction id, ratio) } for
+			reactions fully coupled to a representative through metabolites
+			shared by only two reactions. Flux = ratio * representative flux.
+
+	Bounds and coefficients are evaluated at the growth rate mu_fixed.
+	"""
+	def evaluate(value):
+		if hasattr(value, 'subs'):
+			return float(value.subs(growth_key, mu_fixed))
+		return float(value)
+
+	requested = [ rxn.id for rxn in reactions ]
+
+	# 1. reactions with fixed bounds
+	fixed = {}
+	for rxn in reactions:
+		lb, ub = evaluate(rxn.lower_bound), evaluate(rxn.upper_bound)
+		if lb == ub:
+			fixed[rxn.id] = { 'maximum' : ub, 'minimum' : lb }
+
+	# 2. reactions blocked by deadends: a metabolite that cannot be produced or consumed
+	# forces all its reactions to zero if the metabolite is balanced, and so on
+	mets, blocked = coralme.builder.helper_functions.get_blocked(model, growth_key = growth_key, mu = mu_fixed)
+	for rxn_id in set(requested).intersection(blocked).difference(fixed):
+		fixed[rxn_id] = { 'maximum' : 0., 'minimum' : 0. }
+
+	# 3. full coupling through metabolites shared by only two reactions:
+	# a1 * v1 + a2 * v2 = 0, then v2 = -a1/a2 * v1
+	graph = collections.defaultdict(list)
+	for met in model.metabolites:
+		if len(met._reaction) != 2 or met._bound != 0:
+			continue
+		r1, r2 = list(met._reaction)
+		a1, a2 = evaluate(r1.metabolites[met]), evaluate(r2.metabolites[met])
+		if a1 == 0 or a2 == 0:
+			continue
+		graph[r1.id].append((r2.id, -a1 / a2))
+		graph[r2.id].append((r1.id, -a2 / a1))
+
+	coupled = {}
+	seen = set()
+	requested_set = set(requested)
+	for rxn_id in requested:
+		if rxn_id in seen or rxn_id not in graph:
+			continue
+		# ratios relative to rxn_id, the representative of its group
+		ratios = { rxn_id : 1. }
+		queue = [ rxn_id ]
+		consistent = True
+		while queue:
+			node = queue.pop()
+			for neighbor, ratio in graph[node]:
+				value = ratios[node] * ratio
+				if neighbor not in ratios:
+					ratios[neighbor] = value
+					queue.append(neighbor)
+				elif abs(ratios[neighbor] - value) > 1e-9 * max(1., abs(value)):
+					consistent = False
+		seen.update(ratios.keys())
+		if not consistent:
+			continue
+		for other in requested_set.intersection(ratios.keys()):
+			if other != rxn_id and other not in fixed:
+				coupled[other] = (rxn_id, ratios[other])
+
+	return fixed, coupled
+
 def add_exchange_reactions(me, metabolites, prefix = 'SK_'):
 	rxns = []
 	for met in metabolites:
@@ -682,7 +890,77 @@ def gap_fill(me_model, deadends = [], growth_key_and_value = { sympy.Symbol('mu'
 		logging.warning('  '*5 + 'Provided set of sink reactions for deadend metabolites does not allow growth.')
 		return False
 
-def brute_force_check(me_model, metabolites_to_add, growth_key_and_value):
+def get_warm_start():
+	"""
+	Return an empty record for `warm_feasibility`: the last feasible basis and
+	the elapsed times of the checks with and without a basis.
+	"""
+	return { 'basis' : None, 'warm' : [], 'cold' : [] }
+
+def warm_feasibility(me_model, check, keys, warm_start = None, **kwargs):
+	"""
+	Run the feasibility check `check` (e.g., me_model.feasibility) starting
+	from the last feasible basis in `warm_start`, and record its elapsed time.
+	Backends that do not use a basis ignore it. Checks without a basis are
+	run with basis = False, so that `MEModel.feasibility` does not start
+	from its stored bases either, and their times are a cold baseline.
+	"""
+	if warm_start is None:
+		return check(keys = keys, **kwargs)
+
+	basis = warm_start['basis']
+	start = time.time()
+	if basis is None:
+		# without the bases stored by the ME-model, the baseline of `get_warm_start_savings`
+		feasible = check(keys = keys, basis = False, **kwargs)
+	else:
+		# qMINOS overwrites the basis in place
+		feasible = check(keys = keys, basis = basis.copy(), **kwargs)
+	warm_start['cold' if basis is None else 'warm'].append(time.time() - start)
+
+	if feasible and getattr(me_model, 'basis', None) is not None:
+		warm_start['basis'] = me_model.basis
+	return feasible
+
+def get_warm_start_savings(warm_start):
+	"""
+	Estimate the time saved by the warm-started checks in `warm_start`, from
+	the mean time of the checks without a basis. Returns None if there are
+	no checks of one of the kinds.
+	"""
+	if len(warm_start['warm']) == 0 or len(warm_start['cold']) == 0:
+		return None
+	cold = sum(warm_start['cold']) / len(warm_start['cold'])
+	return cold * len(warm_start['warm']) - sum(warm_start['warm'])
+
+def brute_force_check(me_model, metabolites_to_add, growth_key_and_value, processes = None, method = 'sequential', warm_start = None, state = None, save = None):
+	"""
+	Add a sink reaction for each metabolite and find a minimal set of them
+	that allows growth. Sinks are closed one at a time, in order, and a sink
+	that makes the ME-model infeasible is kept open as a gap.
+
+	Parameters
+	----------
+	processes : int, optional
+		If greater than 1, the sinks are first closed one by one in a process
+		pool, starting from the same basis. A sink that makes the ME-model
+		infeasible on its own is a gap, and it is not tested again (qMINOS
+		only).
+	method : str, {"sequential", "group"}
+		With "group", sinks are closed in groups. A feasible group is closed
+		at once and an infeasible group is split in halves and tested again.
+	warm_start : dict, optional
+		Record from `get_warm_start`. Every check starts from the last
+		feasible basis, and elapsed times are recorded.
+	state : dict, optional
+		Progress of the check: shortlisted sinks ('rxns'), closed sinks
+		('drop'), verdicts of tested sinks ('verdicts') and the last feasible
+		basis. It is updated in place and `save` is called after each verdict.
+		If it contains shortlisted sinks, the check resumes from it.
+
+	Both options return the same gaps as the sequential check, because
+	closing more sinks never makes an infeasible ME-model feasible.
+	"""
 	if sys.platform == 'win32':
 		me_model.get_solution = me_model.opt_gurobi
 		me_model.get_feasibility = me_model.feas_gurobi
@@ -694,29 +972,46 @@ def brute_force_check(me_model, metabolites_to_add, growth_key_and_value):
 # 	existing_sinks = [r.id for r in me_model.reactions.query('^TS_')]
 	sk_rxns = coralme.builder.helper_functions.add_exchange_reactions(me_model, metabolites_to_add, prefix='TS_')
 
-	if me_model.get_feasibility(keys = growth_key_and_value):
-		pass
+	# new sink reactions change the structure of the LP and the basis is no longer valid
+	if warm_start is not None:
+		warm_start['basis'] = None
+
+	if state is not None and 'rxns' in state:
+		# resume from the sinks shortlisted and tested before the run stopped
+		rxns = state['rxns']
+		rxns_to_drop = state['drop']
+		for idx in rxns_to_drop:
+			me_model.reactions.get_by_id(idx).bounds = (0, 0)
+		if warm_start is not None and state.get('basis', None) is not None and state.get('hash', None) == me_model.get_structure_hash():
+			warm_start['basis'] = numpy.array(state['basis'], dtype = numpy.dtype('i4'))
+		logging.warning('  '*5 + 'Resuming from {:d} tested sink reactions.'.format(len(state['verdicts'])))
 	else:
-		logging.warning('  '*5 + 'Provided metabolites through sink reactions cannot recover growth. Proceeding to next set of metabolites.')
-		return metabolites_to_add, [], False
+		if warm_feasibility(me_model, me_model.get_feasibility, growth_key_and_value, warm_start):
+			pass
+		else:
+			logging.warning('  '*5 + 'Provided metabolites through sink reactions cannot recover growth. Proceeding to next set of metabolites.')
+			return metabolites_to_add, [], False
+
+		rxns = []
+		rxns_to_drop = []
+# 		rxns_to_append = []
+# 		for idx, flux in me_model.solution.fluxes.items():
+		for r in sk_rxns:
+			idx = r.id
+			flux = me_model.solution.fluxes[idx]
+			if idx.startswith('TS_') and idx.split('TS_')[1] in metabolites_to_add:
+# 				if r.id in existing_sinks:
+# 					rxns_to_append.append(idx)
+# 					continue
+				if abs(flux) > 0:
+					rxns.append(idx)
+				else:
+					#logging.warning('Closing {}'.format(idx))
+					rxns_to_drop.append(idx)
+					me_model.reactions.get_by_id(idx).bounds = (0, 0)
 
-	rxns = []
-	rxns_to_drop = []
-# 	rxns_to_append = []
-# 	for idx, flux in me_model.solution.fluxes.items():
-	for r in sk_rxns:
-		idx = r.id
-		flux = me_model.solution.fluxes[idx]
-		if idx.startswith('TS_') and idx.split('TS_')[1] in metabolites_to_add:
-# 			if r.id in existing_sinks:
-# 				rxns_to_append.append(idx)
-# 				continue
-			if abs(flux) > 0:
-				rxns.append(idx)
-			else:
-				#logging.warning('Closing {}'.format(idx))
-				rxns_to_drop.append(idx)
-				me_model.reactions.get_by_id(idx).bounds = (0, 0)
+		if state is not None:
+			state.update({ 'rxns' : rxns, 'drop' : rxns_to_drop, 'verdicts' : {} })
 
 	logging.warning('  '*6 + 'Sink reactions shortlisted to {:d} metabolites.'.format(len(rxns)))
 
@@ -736,22 +1031,76 @@ def brute_force_check(me_model, metabolites_to_add, growth_key_and_value):
 	else:
 		Sf, Se, lb, ub = coralme.builder.helper_functions.evaluate_lp_problem(Sf, lambdas, lb, ub, growth_key_and_value, atoms)
 
-	res = []
+	# verdicts: True if the sink is a gap, False if it was closed
+	gaps = {} if state is None else state['verdicts']
+	for rxn, pos in ridx:
+		if gaps.get(rxn, None) is False:
+			lb[pos] = 0
+			ub[pos] = 0
+
 	msg = 'Processed: {:s}/{:d}, Gaps: {:d}. The ME-model is {:s}feasible if {:s} is closed.'
-	for idx, (rxn, pos) in enumerate(ridx):
-		lb[pos] = 0
-		ub[pos] = 0
-		if me_model.get_feasibility(keys = growth_key_and_value, **{'lp' : [Sf, dict(), lb, ub, b, c, cs, set(), lambdas]}):
-			res.append(False)
-			logging.warning('{:s} {:s}'.format('  '*6, msg.format(str(idx+1).rjust(len(str(len(ridx)))), len(ridx), len([ x for x in res if x ]), '', rxn)))
-		else:
+	def _record(rxn, feasible):
+		logging.warning('{:s} {:s}'.format('  '*6, msg.format(str(len(gaps)).rjust(len(str(len(ridx)))), len(ridx), len([ x for x in gaps.values() if x ]), '' if feasible else 'not ', rxn)))
+		if save is not None:
+			if warm_start is not None and warm_start['basis'] is not None:
+				state['basis'] = warm_start['basis'].tolist()
+				state['hash'] = me_model.get_structure_hash()
+			save()
+
+	if processes is not None and processes > 1 and sys.platform != 'win32' and len(ridx) > 1:
+		from coralme.solver.solver import ME_NLP, _get_pool, _init_sweep_worker, _feasibility_worker
+		me_nlp = ME_NLP(Sf, dict(), b, c, lb, ub, cs, set(growth_key_and_value.keys()), None)
+		me_nlp.init_lp()
+
+		muf = list(growth_key_and_value.values())[0]
+		tasks = [ ([ pos ], [ 0. ], [ 0. ], muf, 'quad') for rxn, pos in ridx if rxn not in gaps ]
+		basis = getattr(me_model, 'basis', None) if warm_start is None else warm_start['basis']
+		with _get_pool(processes, _init_sweep_worker, (me_nlp, basis)) as pool:
+			feasible = pool.map(_feasibility_worker, tasks)
+
+		# a sink needed with every other sink open is a gap
+		for (rxn, pos), res in zip([ x for x in ridx if x[0] not in gaps ], feasible):
+			if not res:
+				gaps[rxn] = True
+				_record(rxn, False)
+		logging.warning('  '*6 + 'Sink reactions needed on their own: {:d}. Testing the remaining {:d} sink reactions.'.format(len([ x for x in gaps.values() if x ]), len(ridx) - len(gaps)))
+
+	def close(candidates):
+		# close all candidates at once and keep them closed if the ME-model is still feasible
+		for rxn, pos in candidates:
+			lb[pos] = 0
+			ub[pos] = 0
+		if warm_feasibility(me_model, me_model.get_feasibility, growth_key_and_value, warm_start, **{'lp' : [Sf, dict(), lb, ub, b, c, cs, set(), lambdas]}):
+			return True
+		for rxn, pos in candidates:
 			lb[pos] = -1000
 			ub[pos] = +1000
-			res.append(True)
-			logging.warning('{:s} {:s}'.format('  '*6, msg.format(str(idx+1).rjust(len(str(len(ridx)))), len(ridx), len([ x for x in res if x ]), 'not ', rxn)))
+		return False
+
+	def search(candidates):
+		if len(candidates) == 0:
+			return None
+		if close(candidates):
+			for rxn, pos in candidates:
+				gaps[rxn] = False
+				_record(rxn, True)
+		elif len(candidates) == 1:
+			gaps[candidates[0][0]] = True
+			_record(candidates[0][0], False)
+		else:
+			half = len(candidates) // 2
+			search(candidates[:half])
+			search(candidates[half:])
+
+	candidates = [ (rxn, pos) for rxn, pos in ridx if rxn not in gaps ]
+	if method == 'group':
+		search(candidates)
+	else:
+		for candidate in candidates:
+			search([ candidate ])
 
-	bf_gaps = [ y for x,y in zip(res, rxns) if x ] # True
-	no_gaps = [ y for x,y in zip(res, rxns) if not x ] + rxns_to_drop
+	bf_gaps = [ x for x in rxns if gaps[x] ] # True
+	no_gaps = [ x for x in rxns if not gaps[x] ] + rxns_to_drop
 
 	return bf_gaps, no_gaps, True
 
@@ -778,7 +1127,7 @@ def get_mets_from_type(me_model,met_type):
 def _append_metabolites(mets,new_mets):
 	return mets + [m for m in new_mets if m not in mets]
 
-def brute_check(me_model, growth_key_and_value, met_type, skip = set(), history = dict()):
+def brute_check(me_model, growth_key_and_value, met_type, skip = set(), history = dict(), processes = None, method = 'sequential', warm_start = None, state = None, save = None):
 	mets = get_mets_from_type(me_model,met_type)
 	if met_type == 'Metabolite':
 		#remove from the metabolites to test that are fed into the model through transport reactions
@@ -808,7 +1157,12 @@ def brute_check(me_model, growth_key_and_value, met_type, skip = set(), history
 		mets_to_check = _append_metabolites(mets_to_check,v)
 	return history,coralme.builder.helper_functions.brute_force_check(me_model,
 															  mets_to_check[::-1],
-															  growth_key_and_value)
+															  growth_key_and_value,
+															  processes = processes,
+															  method = method,
+															  warm_start = warm_start,
+															  state = state,
+															  save = save)
 
 def evaluate_lp_problem(Sf, Se, lb, ub, keys, atoms):
 	lb = [ x(*[ keys[x] for x in list(atoms) ]) if hasattr(x, '__call__') else float(x.xreplace(keys)) if hasattr(x, 'subs') else x for x in lb ]
@@ -4,6 +4,7 @@ import io
 import os
 import re
 import sys
+import json
 import pickle
 import shutil
 import pathlib
@@ -1542,7 +1543,7 @@ class MEBuilder(object):
 	def build_me_model(self, update = True, prune = True, overwrite = False, skip = None):
 		coralme.builder.main.MEReconstruction(self).build_me_model(update = update, prune = prune, overwrite = overwrite, skip = skip)
 
-	def troubleshoot(self, growth_key_and_value = None, skip = set(), guesses = set(), platform = None, solver = 'gurobi', savefile = None, gapfill_cofactors=False):
+	def troubleshoot(self, growth_key_and_value = None, skip = set(), guesses = set(), platform = None, solver = 'gurobi', savefile = None, gapfill_cofactors=False, processes = None, method = 'sequential', checkpoint = None, resume = False):
 		"""
 		growth_key_and_value:
 			dictionary of Sympy.Symbol and value to replace
@@ -1561,9 +1562,21 @@ class MEBuilder(object):
 
 		savefile:
 			file path (absolute or relative) to save the ME-model as a pickle file
+
+		processes:
+			number of processes to screen sink reactions in parallel (qMINOS only)
+
+		method:
+			'sequential' (default) or 'group' to close sink reactions in groups
+
+		checkpoint:
+			JSON file to save the progress of troubleshooting (see METroubleshooter)
+
+		resume:
+			if True, continue from the progress saved in the checkpoint file
 		"""
 
-		coralme.builder.main.METroubleshooter(self).troubleshoot(growth_key_and_value, skip = skip, guesses = guesses, platform = platform, solver = solver, savefile = savefile,gapfill_cofactors=gapfill_cofactors)
+		coralme.builder.main.METroubleshooter(self).troubleshoot(growth_key_and_value, skip = skip, guesses = guesses, platform = platform, solver = solver, savefile = savefile,gapfill_cofactors=gapfill_cofactors, processes = processes, method = method, checkpoint = checkpoint, resume = resume)
 		coralme.builder.helper_functions.save_curation_notes(
 				self.curation_notes,
 				self.configuration['out_directory'] + '/curation_notes.json'
@@ -2860,7 +2873,8 @@ class METroubleshooter(object):
 
 	def troubleshoot(self, growth_key_and_value = None, skip = set(),
 		guesses = [], met_types = [], platform = None, solver = 'gurobi', savefile = None,
-		gapfill_cofactors = False):
+		gapfill_cofactors = False, processes = None, method = 'sequential',
+		checkpoint = None, resume = False):
 		"""Performs the Gap-finding step of the reconstruction.
 
 		This function will iterate through different parts of the M-
@@ -2882,6 +2896,21 @@ class METroubleshooter(object):
 			'win32' or 'darwin' to use gurobi (default) or cplex as solver
 		solver: str
 			Solver to use. Values: 'gurobi' (default) or 'cplex'
+		processes: int
+			If greater than 1, sink reactions are first closed one by one in a
+			process pool to find gaps faster (qMINOS only)
+		method: str
+			'sequential' (default) closes sink reactions one at a time, and
+			'group' closes them in groups that are split if needed. Both
+			methods find the same gaps.
+		checkpoint: str
+			JSON file to save the progress of the gap-finding steps after each
+			tested sink reaction. Defaults to
+			METroubleshooter-<ME-Model-ID>.checkpoint.json in the output
+			directory. The file is removed when troubleshooting finishes.
+		resume: bool
+			If True and the checkpoint file exists, continue from the step and
+			sink reactions saved in it.
 		"""
 		types = {
 			'M-matrix' : ['ME-Deadends', 'Cofactors', 'All-Deadends', 'Metabolite' ],
@@ -2955,35 +2984,82 @@ class METroubleshooter(object):
 			for ts in ts_cofactors:
 				ts.bounds = (1e-6,1000)
 
-		# Step 1. Test if current ME-model is feasible
-		logging.warning('  '*1 + 'Checking if the ME-model can simulate growth without gapfilling reactions...')
-		if self.me_model.check_feasibility(keys = growth_key_and_value):
-			logging.warning('  '*1 + 'Original ME-model is feasible with a tested growth rate of {:f} 1/h'.format(list(growth_value)[0]))
-			works = True
-		else:
-			logging.warning('  '*1 + 'Original ME-model is not feasible with a tested growth rate of {:f} 1/h'.format(list(growth_value)[0]))
-			works = False
+		# the last feasible basis warm-starts the next feasibility check
+		self.warm_start = coralme.builder.helper_functions.get_warm_start()
+
+		# progress of the gap-finding steps
+		if checkpoint is None:
+			checkpoint = '{:s}/METroubleshooter-{:s}.checkpoint.json'.format(out_directory, model)
+		progress = None
+		if resume and os.path.isfile(checkpoint):
+			with open(checkpoint, 'r') as infile:
+				progress = json.load(infile)
+
+		if progress is None:
+			# Step 1. Test if current ME-model is feasible
+			logging.warning('  '*1 + 'Checking if the ME-model can simulate growth without gapfilling reactions...')
+			if coralme.builder.helper_functions.warm_feasibility(self.me_model, self.me_model.check_feasibility, growth_key_and_value, self.warm_start):
+				logging.warning('  '*1 + 'Original ME-model is feasible with a tested growth rate of {:f} 1/h'.format(list(growth_value)[0]))
+				works = True
+			else:
+				logging.warning('  '*1 + 'Original ME-model is not feasible with a tested growth rate of {:f} 1/h'.format(list(growth_value)[0]))
+				works = False
 
-		# Step 2. Test different sets of MEComponents
-		if len(guesses) > 0:
-			guesses = [ x for x in guesses if self.me_model.metabolites.has_id(x) ]
+			# Step 2. Test different sets of MEComponents
 			if len(guesses) > 0:
-				met_types.insert(0, (guesses, 'User guesses'))
+				guesses = [ x for x in guesses if self.me_model.metabolites.has_id(x) ]
+				if len(guesses) > 0:
+					met_types.insert(0, (guesses, 'User guesses'))
+
+			history = dict()
+			progress = { 'step' : 0, 'state' : {} }
+		else:
+			logging.warning('  '*1 + 'Resuming troubleshooting from step {:d} saved in {:s}'.format(progress['step'] + 1, checkpoint))
+			works = False
+			met_types = [ tuple(x) for x in progress['met_types'] ]
+			history = { k:set(v) for k,v in progress['history'].items() }
+
+			# restore the sink reactions left by the previous steps and their bounds
+			sinks = progress.get('sinks', {})
+			self.me_model.remove_reactions([ rxn for rxn in self.me_model.reactions.query('^TS_') if rxn.id not in sinks ])
+			coralme.builder.helper_functions.add_exchange_reactions(self.me_model, [ x[3:] for x in sinks.keys() ], prefix = 'TS_')
+			for rxn_id, bounds in sinks.items():
+				self.me_model.reactions.get_by_id(rxn_id).bounds = tuple(bounds)
+			# and the bounds relaxed by previous steps of E-matrix components
+			if any(x[0] == 'E-matrix' for x in met_types[:progress['step']]):
+				self.me_model.relax_bounds()
+				self.me_model.reactions.protein_biomass_to_biomass.lower_bound = growth_value[0]/100
+
+		def save():
+			progress.update({
+				'met_types' : met_types,
+				'history' : { k:sorted(v) for k,v in history.items() },
+				})
+			with open(checkpoint, 'w') as outfile:
+				json.dump(progress, outfile)
 
 		e_gaps = []
-		history = dict()
 		if works == False:
 			#logging.warning('~ '*1 + 'Step 3. Attempt gapfilling different groups of E-matrix components.')
 			for idx, met_type in enumerate(met_types):
+				if idx < progress['step']:
+					continue
+				if idx > progress['step']:
+					progress.update({ 'step' : idx, 'state' : {} })
+					progress.pop('sinks', None)
+				if 'sinks' not in progress:
+					# sink reactions left by the previous steps, restored on resume
+					progress['sinks'] = { rxn.id:[ float(rxn.lower_bound), float(rxn.upper_bound) ] for rxn in self.me_model.reactions.query('^TS_') }
+				save()
 				logging.warning('  '*1 + 'Step {}. Gapfill reactions to provide components of type \'{:s}\' using brute force.'.format(idx + 1, met_type[1]))
 				if met_type[0] == 'E-matrix':
 					logging.warning('  '*5 + 'Relaxing bounds for E-matrix gap-fill')
 					self.me_model.relax_bounds()
 					self.me_model.reactions.protein_biomass_to_biomass.lower_bound = growth_value[0]/100 # Needed to enforce protein production
 				if met_type[1] == 'User guesses':
-					history, output = coralme.builder.helper_functions.brute_check(self.me_model, growth_key_and_value, met_type, skip = skip, history = history)
+					history, output = coralme.builder.helper_functions.brute_check(self.me_model, growth_key_and_value, met_type, skip = skip, history = history, processes = processes, method = method, warm_start = self.warm_start, state = progress['state'], save = save)
 				else:
-					history, output = coralme.builder.helper_functions.brute_check(self.me_model, growth_key_and_value, met_type[1], skip = skip, history = history)
+					history, output = coralme.builder.helper_functions.brute_check(self.me_model, growth_key_and_value, met_type[1], skip = skip, history = history, processes = processes, method = method, warm_start = self.warm_start, state = progress['state'], save = save)
 				bf_gaps, no_gaps, works = output
 				# close sink reactions that are not gaps
 				if no_gaps:
@@ -3037,6 +3113,14 @@ class METroubleshooter(object):
 			logging.warning('~ '*1 + 'METroubleshooter failed to determine a set of problematic metabolites.')
 			self.me_model.troubleshooted = False
 
+		if os.path.isfile(checkpoint):
+			os.remove(checkpoint)
+
+		saved = coralme.builder.helper_functions.get_warm_start_savings(self.warm_start)
+		if saved is not None:
+			logging.warning('~ '*1 + 'Feasibility checks: {:d} warm-started and {:d} without a basis. Estimated time saved by warm-starts: {:.1f} seconds.'.format(
+				len(self.warm_start['warm']), len(self.warm_start['cold']), saved))
+
 		logging.shutdown()
 
 		# We will remove duplicates entries in the log output
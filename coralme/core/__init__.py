@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 __version__ = "1.0"
 
+import coralme.core.coefficient
 import coralme.core.component
 import coralme.core.model
 import coralme.core.processdata
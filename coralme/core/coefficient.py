@@ -0,0 +1,116 @@
+import sympy
+
+import logging
+log = logging.getLogger(__name__)
+
+class CoefficientTable(object):
+	"""
+	Interned symbolic coefficients and bounds of a ME-model, and their
+	compact forms.
+
+	Coefficients of ME-models are sums of terms like mu/(keff*3600) or
+	mu*c/(mu+kt*r0). Each term is a float multiplier times a basis function
+	of mu, and only a few basis functions are different across the model.
+	Equal coefficients are stored once: `intern` returns the object already
+	in the table, and the expression itself is not rewritten.
+
+	The compact form of a coefficient, (constant, { basis index : multiplier }),
+	is returned by `split`, and `basis` lists the basis functions shared by
+	all the coefficients of the ME-model.
+
+	Coefficients that are not used anymore are dropped by `prune`. The
+	ME-model calls it with its current coefficients when the table reaches
+	`limit` entries, and the limit is raised to twice the entries kept.
+	"""
+	def __init__(self, limit = 65536):
+		self.basis = []
+		self._basis = {} # { basis function : index }
+		self._values = {} # { coefficient : interned coefficient }
+		self._split = {} # { interned coefficient : compact form }
+		self.limit = limit
+		self.hits = 0 # equal coefficients replaced by the interned object
+		self.misses = 0 # coefficients added to the table
+
+	def __len__(self):
+		return len(self._values)
+
+	def __repr__(self):
+		return '<{:s} with {:d} coefficients and {:d} basis functions at 0x{:x}>'.format(
+			self.__class__.__name__, len(self._values), len(self.basis), id(self))
+
+	def _get_terms(self, value):
+		# constant and { basis function : multiplier }; nested sums are flattened
+		const = 0.
+		terms = {}
+		stack = [ (value, 1.) ]
+		while stack:
+			expr, mult = stack.pop()
+			for fn, coeff in expr.as_coefficients_dict().items():
+				if len(fn.free_symbols) == 0:
+					const += mult * float(coeff * fn)
+				elif fn.is_Add:
+					stack.append((fn, mult * float(coeff)))
+				else:
+					terms[fn] = terms.get(fn, 0.) + mult * float(coeff)
+		return const, terms
+
+	def intern(self, value):
+		"""
+		Return the coefficient or bound in the table equal to value, adding
+		value if there is none. Numbers and expressions without free symbols
+		are returned as floats.
+		"""
+		if not hasattr(value, 'free_symbols'):
+			return value
+		if len(value.free_symbols) == 0:
+			return float(value)
+
+		interned = self._values.get(value, None)
+		if interned is None:
+			self.misses += 1
+			interned = self._values[value] = value
+		elif interned is not value:
+			self.hits += 1
+		return interned
+
+	def prune(self, values):
+		"""
+		Keep only the coefficients in values (e.g., the coefficients and
+		bounds of the reactions of the ME-model). Basis functions are kept,
+		so their indices do not change.
+		"""
+		kept = {}
+		for value in values:
+			if hasattr(value, 'free_symbols') and len(value.free_symbols) != 0:
+				interned = self._values.get(value, value)
+				kept[interned] = interned
+		self._split = { k:v for k,v in self._split.items() if k in kept }
+		log.debug('Pruned {:d} of {:d} coefficients.'.format(len(self._values) - len(kept), len(self._values)))
+		self._values = kept
+		self.limit = max(self.limit, 2 * len(kept))
+
+	def split(self, value):
+		"""
+		Return the compact form of a coefficient or bound, as a constant and
+		a dictionary of { basis index : multiplier }.
+		"""
+		if not hasattr(value, 'free_symbols') or len(value.free_symbols) == 0:
+			return float(value), {}
+		key = self._split.get(value, None)
+		if key is None:
+			const, terms = self._get_terms(value)
+			terms = { self._basis.setdefault(fn, len(self._basis)):mult for fn, mult in terms.items() if mult != 0 }
+			if len(self._basis) != len(self.basis):
+				self.basis.extend(list(self._basis.keys())[len(self.basis):])
+			key = (const, tuple(sorted(terms.items())))
+			if value in self._values:
+				self._split[value] = key
+		return key[0], dict(key[1])
+
+	def split_coefficient(self, value):
+		"""
+		Same as `split`, with the basis functions as keys instead of their
+		indices, see `coralme.solver.template.split_coefficient`.
+		"""
+		const, terms = self.split(value)
+		return const, { self.basis[idx]:mult for idx, mult in terms.items() }
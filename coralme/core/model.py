@@ -1,6 +1,12 @@
+import os
+import sys
 import re
+import json
 import pickle
+import types
 import typing
+import hashlib
+import collections
 
 import logging
 log = logging.getLogger(__name__)
@@ -24,6 +30,277 @@ def _update(MEReaction):
 	MEReaction.update()
 	return None
 
+# ME-model and snapshot of metabolite formulas of the workers of MEModel._parallel_update
+_update_model = None
+_update_snapshot = None
+
+def _init_update_worker(model, verbose):
+	global _update_model, _update_snapshot
+	_update_model = model
+	_update_snapshot = {
+		'formulas' : { met.id:met.formula for met in model.metabolites },
+		'verbose' : verbose,
+		}
+
+def _update_worker(rxn_ids):
+	"""
+	Update reactions in the copy of the ME-model of the worker and return
+	(reaction ID, stoichiometry, bounds, formulas) for each reaction. The
+	stoichiometry is None if the parent must update the reaction, because it
+	creates components, reactions or process data, or modifies other reactions.
+	"""
+	model = _update_model
+	formulas = _update_snapshot['formulas']
+	results = []
+	for rxn_id in rxn_ids:
+		rxn = model.reactions.get_by_id(rxn_id)
+		if not getattr(rxn, '_local_update', True):
+			results.append((rxn_id, None, None, None))
+			continue
+
+		nrxns, ndata = len(model.reactions), len(model.process_data)
+		rxn.update(verbose = _update_snapshot['verbose'])
+		stoichiometry = { met.id:value for met, value in rxn.metabolites.items() }
+		if len(model.reactions) != nrxns or len(model.process_data) != ndata or not formulas.keys() >= stoichiometry.keys():
+			results.append((rxn_id, None, None, None))
+			continue
+
+		# formulas of products, e.g. complexes, proteins, and transcripts
+		changed = { met.id:met.formula for met in rxn.metabolites if met.formula != formulas[met.id] }
+		results.append((rxn_id, stoichiometry, rxn.bounds, changed))
+	return results
+
+def _get_lp_digest(*arrays):
+	"""
+	Return a hash of the values of an LP problem (e.g., Sf, Se, lb, ub, b and
+	c from `MEModel.construct_lp_problem`). Dictionaries are hashed sorted by
+	key, and symbolic values by their string form.
+	"""
+	md5 = hashlib.md5()
+	for values in arrays:
+		if isinstance(values, dict):
+			values = sorted(values.items())
+		for value in values:
+			md5.update(repr(value).encode('utf-8'))
+			md5.update(b'\t')
+		md5.update(b'\n')
+	return md5.hexdigest()
+
+class SweepResults(object):
+	"""
+	Columnar store of the results of :meth:`MEModel.sweep`.
+
+	Growth rates and statuses are arrays with one entry per condition, and
+	fluxes are a (conditions x reactions) array. If `filename` is given, the
+	fluxes are written into a memory-mapped .npy file as results arrive.
+
+	Parameters
+	----------
+	conditions : list
+		Names of the conditions
+	reactions : list
+		Reaction identifiers, in the order of the ME-model
+	filename : str, optional
+		Path to a .npy file to store fluxes on disk
+	"""
+	def __init__(self, conditions, reactions, filename = None):
+		self.conditions = list(conditions)
+		self.reactions = list(reactions)
+		self._index = { k:idx for idx, k in enumerate(self.conditions) }
+
+		self.objective_value = numpy.full(len(self.conditions), numpy.nan)
+		self.status = numpy.full(len(self.conditions), None, dtype = object)
+
+		shape = (len(self.conditions), len(self.reactions))
+		if filename is None:
+			self.fluxes = numpy.full(shape, numpy.nan)
+		else:
+			self.fluxes = numpy.lib.format.open_memmap(filename, mode = 'w+', dtype = float, shape = shape)
+			self.fluxes[:] = numpy.nan
+
+	def add(self, condition, objective_value, status, fluxes = None):
+		idx = self._index[condition]
+		self.status[idx] = status
+		if status == 'optimal':
+			self.objective_value[idx] = objective_value
+			if fluxes is not None:
+				self.fluxes[idx, :] = fluxes
+
+	def flush(self):
+		if hasattr(self.fluxes, 'flush'):
+			self.fluxes.flush()
+
+	def summary(self):
+		"""Return a DataFrame with the growth rate and status per condition."""
+		return pandas.DataFrame({ 'objective_value' : self.objective_value, 'status' : self.status }, index = self.conditions)
+
+	def to_frame(self):
+		"""Return the fluxes as a DataFrame (reactions x conditions)."""
+		return pandas.DataFrame(numpy.asarray(self.fluxes).T, index = self.reactions, columns = self.conditions)
+
+class ProcessDataView(cobra.core.dictlist.DictList):
+	"""
+	Read-only DictList of the ProcessData of one type, returned by
+	`ProcessDataList.get_view`. It is kept up to date by the ProcessDataList;
+	modifying it raises a TypeError. Slices and queries are new DictLists.
+	"""
+	_frozen = False
+
+	def _check_frozen(self):
+		if self._frozen:
+			raise TypeError('Views of the process data are read-only. Modify the process_data of the ME-model instead.')
+
+	def _update(self, added = (), removed = ()):
+		self._frozen = False
+		try:
+			for obj in removed:
+				self.remove(obj.id)
+			for obj in added:
+				self.append(obj)
+		finally:
+			self._frozen = True
+
+	def append(self, entity):
+		self._check_frozen()
+		cobra.core.dictlist.DictList.append(self, entity)
+
+	def extend(self, iterable):
+		self._check_frozen()
+		cobra.core.dictlist.DictList.extend(self, iterable)
+
+	def _extend_nocheck(self, iterable):
+		self._check_frozen()
+		cobra.core.dictlist.DictList._extend_nocheck(self, iterable)
+
+	def pop(self, *args):
+		self._check_frozen()
+		return cobra.core.dictlist.DictList.pop(self, *args)
+
+	def remove(self, x):
+		self._check_frozen()
+		cobra.core.dictlist.DictList.remove(self, x)
+
+	def insert(self, index, entity):
+		self._check_frozen()
+		cobra.core.dictlist.DictList.insert(self, index, entity)
+
+	def _replace_on_id(self, new_object):
+		self._check_frozen()
+		cobra.core.dictlist.DictList._replace_on_id(self, new_object)
+
+	def __setitem__(self, i, y):
+		self._check_frozen()
+		cobra.core.dictlist.DictList.__setitem__(self, i, y)
+
+	def __delitem__(self, index):
+		self._check_frozen()
+		cobra.core.dictlist.DictList.__delitem__(self, index)
+
+	def sort(self, cmp = None, key = None, reverse = False):
+		self._check_frozen()
+		cobra.core.dictlist.DictList.sort(self, cmp = cmp, key = key, reverse = reverse)
+
+	def reverse(self):
+		self._check_frozen()
+		cobra.core.dictlist.DictList.reverse(self)
+
+	def clear(self):
+		self._check_frozen()
+		list.clear(self)
+		self._dict = {}
+
+class ProcessDataList(cobra.core.dictlist.DictList):
+	"""
+	DictList of the ProcessData of a ME-model that keeps an index per type.
+
+	`get_view(cls)` returns a read-only DictList (see `ProcessDataView`) with
+	the elements that are instances of `cls`, in the order of the
+	ProcessDataList. Views are built on first use and maintained when process
+	data is appended or removed. Other modifications (insert, sort,
+	replacement) discard the views, and they are built again on the next
+	access.
+	"""
+	def __init__(self, *args):
+		self._views = {}
+		self._version = 0
+		cobra.core.dictlist.DictList.__init__(self, *args)
+
+	def _changed(self, added = (), removed = (), reset = False):
+		self._version = getattr(self, '_version', 0) + 1
+		views = getattr(self, '_views', None)
+		if views is None or reset:
+			self._views = {}
+			return None
+		for cls, view in views.items():
+			view._update(
+				added = [ obj for obj in added if isinstance(obj, cls) ],
+				removed = [ obj for obj in removed if isinstance(obj, cls) ])
+
+	def get_view(self, cls):
+		views = getattr(self, '_views', None)
+		if views is None:
+			views = self._views = {}
+		if cls not in views:
+			views[cls] = ProcessDataView([ x for x in self if isinstance(x, cls) ])
+			views[cls]._frozen = True
+		return views[cls]
+
+	def append(self, entity):
+		cobra.core.dictlist.DictList.append(self, entity)
+		self._changed(added = [ entity ])
+
+	def extend(self, iterable):
+		start = len(self)
+		try:
+			cobra.core.dictlist.DictList.extend(self, iterable)
+		except ValueError:
+			# DictList keeps the elements added before a duplicated id
+			list.__delitem__(self, slice(start, None))
+			self._generate_index()
+			raise
+		self._changed(added = list.__getitem__(self, slice(start, None)))
+
+	def _extend_nocheck(self, iterable):
+		start = len(self)
+		cobra.core.dictlist.DictList._extend_nocheck(self, iterable)
+		self._changed(added = list.__getitem__(self, slice(start, None)))
+
+	def pop(self, *args):
+		value = cobra.core.dictlist.DictList.pop(self, *args)
+		self._changed(removed = [ value ])
+		return value
+
+	def insert(self, index, entity):
+		cobra.core.dictlist.DictList.insert(self, index, entity)
+		self._changed(reset = True)
+
+	def _replace_on_id(self, new_object):
+		cobra.core.dictlist.DictList._replace_on_id(self, new_object)
+		self._changed(reset = True)
+
+	def __setitem__(self, i, y):
+		cobra.core.dictlist.DictList.__setitem__(self, i, y)
+		self._changed(reset = True)
+
+	def __delitem__(self, index):
+		cobra.core.dictlist.DictList.__delitem__(self, index)
+		self._changed(reset = True)
+
+	def sort(self, cmp = None, key = None, reverse = False):
+		cobra.core.dictlist.DictList.sort(self, cmp = cmp, key = key, reverse = reverse)
+		self._changed(reset = True)
+
+	def reverse(self):
+		cobra.core.dictlist.DictList.reverse(self)
+		self._changed(reset = True)
+
+	def __setstate__(self, state):
+		cobra.core.dictlist.DictList.__setstate__(self, state)
+		self._changed(reset = True)
+
+	def __getstate__(self):
+		return { '_dict' : self._dict }
+
 class MEModel(cobra.core.model.Model):
 	def __init__(self, name = 'coralME', mu = 'mu'):
 		cobra.Model.__init__(self, name)
@@ -212,8 +489,10 @@ class MEModel(cobra.core.model.Model):
 			'braun\'s_murein_flux' : -0.0,
 			}
 
-		self.process_data = cobra.core.dictlist.DictList()
+		self.process_data = ProcessDataList()
 		self.metabolites = cobra.core.dictlist.DictList()
+		# interned symbolic coefficients and bounds
+		self.coefficients = coralme.core.coefficient.CoefficientTable()
 
 		# set growth rate symbolic variable
 		self._mu = sympy.Symbol(mu, positive = True)
@@ -247,6 +526,22 @@ class MEModel(cobra.core.model.Model):
 		self.troubleshooted = False
 		self.troubleshooting = False
 
+		# warm-start bases, see `store_basis` and `get_basis`
+		self._basis_store = collections.OrderedDict()
+
+		# LP problem and reactions modified since extraction, see `construct_lp_problem`
+		self._lp_cache = None
+		self._lp_dirty = set()
+		# (number of reactions and metabolites, hash), see `get_structure_hash`
+		self._structure_hash = None
+
+	def __getstate__(self):
+		# solver models kept with the compiled LP problem cannot be pickled
+		state = cobra.core.model.Model.__getstate__(self)
+		if state.get('_lp_cache', None) is not None:
+			state['_lp_cache'] = { k:v for k,v in state['_lp_cache'].items() if k != 'compiled' }
+		return state
+
 	@property
 	def mu(self):
 		return self._mu
@@ -260,14 +555,59 @@ class MEModel(cobra.core.model.Model):
 		if self._mu_old == self._mu:
 			return # doing nothing because user changed to the current mu
 
+		# basis functions of the old symbol are not shared anymore
+		self.coefficients = coralme.core.coefficient.CoefficientTable()
 		for rxn in self.reactions:
 			if hasattr(rxn.lower_bound, 'subs'):
-				rxn._lower_bound = rxn.lower_bound.subs({ self._mu_old : self.mu })
+				rxn._lower_bound = self._intern(rxn.lower_bound.subs({ self._mu_old : self.mu }))
 			if hasattr(rxn.upper_bound, 'subs'):
-				rxn._upper_bound = rxn.upper_bound.subs({ self._mu_old : self.mu })
+				rxn._upper_bound = self._intern(rxn.upper_bound.subs({ self._mu_old : self.mu }))
 			for met, coeff in rxn.metabolites.items():
 				if hasattr(coeff, 'subs'):
-					rxn._metabolites[met] = coeff.subs({ self._mu_old : self.mu })
+					rxn._metabolites[met] = self._intern(coeff.subs({ self._mu_old : self.mu }))
+
+		self._mark_lp_dirty()
+
+	def _get_coefficients(self):
+		table = getattr(self, 'coefficients', None)
+		if table is None:
+			# ME-models saved before coefficients were interned
+			table = self.coefficients = coralme.core.coefficient.CoefficientTable()
+		return table
+
+	def _intern(self, value):
+		# shared copy of a coefficient or bound, see `coralme.core.coefficient`
+		if not hasattr(value, 'free_symbols'):
+			return value
+		table = self._get_coefficients()
+		if len(table) >= table.limit:
+			# drop the coefficients not used by the reactions anymore
+			table.prune(self._get_coefficient_values())
+		return table.intern(value)
+
+	def _get_coefficient_values(self):
+		for rxn in self.reactions:
+			yield rxn._lower_bound
+			yield rxn._upper_bound
+			yield from rxn._metabolites.values()
+
+	@property
+	def metabolite_index(self):
+		"""
+		Read-only dictionary of { metabolite ID : row index } of the
+		stoichiometric matrix. The index is maintained when metabolites are
+		added, removed or renamed; do not keep it across such changes.
+		"""
+		return types.MappingProxyType(self.metabolites._dict)
+
+	@property
+	def reaction_index(self):
+		"""
+		Read-only dictionary of { reaction ID : column index } of the
+		stoichiometric matrix. The index is maintained when reactions are
+		added, removed or renamed; do not keep it across such changes.
+		"""
+		return types.MappingProxyType(self.reactions._dict)
 
 	#TODO: set me.genes with [ x.id.split('RNA_')[1] for x in builder.me_model.metabolites.query(re.compile('^RNA_(?!biomass|dummy|degradosome)')) ]
 	#@property
@@ -349,6 +689,7 @@ class MEModel(cobra.core.model.Model):
 					x.remove_from_model()
 
 		self.metabolites -= metabolite_list
+		self._mark_lp_dirty([], reindex = True)
 
 	# This function comes from cobrapy, modified to NOT create variables in the solver
 	def add_reactions(self, reaction_list):
@@ -392,6 +733,13 @@ class MEModel(cobra.core.model.Model):
 					reaction._metabolites[model_metabolite] = stoichiometry
 					model_metabolite._reaction.add(reaction)
 
+			# reactions built outside the ME-model
+			for metabolite, stoichiometry in reaction._metabolites.items():
+				if hasattr(stoichiometry, 'free_symbols'):
+					reaction._metabolites[metabolite] = self._intern(stoichiometry)
+			reaction._lower_bound = self._intern(reaction._lower_bound)
+			reaction._upper_bound = self._intern(reaction._upper_bound)
+
 			for gene in list(reaction._genes):
 				# If the gene is not in the model, add it
 				if not self.genes.has_id(gene.id):
@@ -405,6 +753,8 @@ class MEModel(cobra.core.model.Model):
 						reaction._associate_gene(model_gene)
 
 		self.reactions += pruned
+		self._mark_lp_dirty(pruned)
+		self._dependency_graph = None
 
 		# from cameo ...
 		#self._populate_solver(pruned)
@@ -439,6 +789,8 @@ class MEModel(cobra.core.model.Model):
 				#self.remove_cons_vars([forward, reverse])
 				self.reactions.remove(reaction)
 				reaction._model = None
+				self._mark_lp_dirty([ reaction ], reindex = True)
+				self._dependency_graph = None
 
 				for met in reaction._metabolites:
 					if reaction in met._reaction:
@@ -629,6 +981,7 @@ class MEModel(cobra.core.model.Model):
 		# check stoichiometry
 		if self.reactions.GAM.check_mass_balance() == {'charge': -1.0, 'H': -1.0}:
 			self.reactions.GAM._metabolites.update({self.metabolites.h_c : +1})
+			self._mark_lp_dirty([ self.reactions.GAM ])
 
 	@property
 	def ngam(self):
@@ -649,81 +1002,52 @@ class MEModel(cobra.core.model.Model):
 		# check stoichiometry
 		if self.reactions.ATPM.check_mass_balance() == {'charge': -1.0, 'H': -1.0}:
 			self.reactions.ATPM._metabolites.update({self.metabolites.h_c : +1})
+			self._mark_lp_dirty([ self.reactions.ATPM ])
 
 	# data types generators:
 	# StoichiometricData, ComplexData, TranslationData, TranscriptionData,
 	# GenericData, tRNAData, TranslocationData, PostTranslationData, SubreactionData
+	def _get_process_data_view(self, cls):
+		# ME-models saved before ProcessDataList was introduced
+		if not isinstance(self.process_data, ProcessDataList):
+			self.process_data = ProcessDataList(self.process_data)
+		return self.process_data.get_view(cls)
+
 	@property
 	def stoichiometric_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.StoichiometricData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.StoichiometricData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.StoichiometricData)
 
 	@property
 	def complex_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.ComplexData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.ComplexData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.ComplexData)
 
 	@property
 	def translation_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.TranslationData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.TranslationData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.TranslationData)
 
 	@property
 	def transcription_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.TranscriptionData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.TranscriptionData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.TranscriptionData)
 
 	@property
 	def generic_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.GenericData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.GenericData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.GenericData)
 
 	@property
 	def tRNA_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.tRNAData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.tRNAData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.tRNAData)
 
 	@property
 	def translocation_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.TranslocationData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.TranslocationData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.TranslocationData)
 
 	@property
 	def posttranslation_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.PostTranslationData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.PostTranslationData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.PostTranslationData)
 
 	@property
 	def subreaction_data(self):
-		#for data in self.process_data:
-			#if isinstance(data, coralme.core.processdata.SubreactionData):
-				#yield data
-		lst = [ x for x in self.process_data if isinstance(x, coralme.core.processdata.SubreactionData)]
-		return cobra.core.dictlist.DictList(lst)
+		return self._get_process_data_view(coralme.core.processdata.SubreactionData)
 
 	@property
 	def all_genes(self):
@@ -800,17 +1124,7 @@ class MEModel(cobra.core.model.Model):
 
 	def construct_s_matrix(self, growth_rate) -> scipy.sparse.dok_matrix:
 		"""Build the stoichiometric matrix at a specific growth rate."""
-		# initialize to 0
-		s_matrix = scipy.sparse.dok_matrix((len(self.metabolites), len(self.reactions)))
-		# populate with stoichiometry
-		for idx, rxn in tqdm.tqdm(list(enumerate(self.reactions)), 'Constructing stoichiometric matrix', bar_format = bar_format):
-			for met, value in rxn.metabolites.items():
-				met_index = self.metabolites.index(met)
-				if hasattr(value, 'subs'):
-					s_matrix[met_index, idx] = float(value.subs(self.mu, growth_rate))
-				else:
-					s_matrix[met_index, idx] = float(value)
-		return s_matrix
+		return self.to_sparse(growth_rate).todok()
 
 	def _construct_attribute_vector(self, attr_name, growth_rate):
 		"""
@@ -829,7 +1143,7 @@ class MEModel(cobra.core.model.Model):
 		if solution is None:
 			solution = self.solution
 
-		s_matrix = self.construct_s_matrix(solution.objective_value)
+		s_matrix = self.to_sparse(solution.objective_value)
 		lb = self._construct_attribute_vector('lower_bound', solution.objective_value)
 		ub = self._construct_attribute_vector('upper_bound', solution.objective_value)
 		# old code
@@ -1027,20 +1341,202 @@ class MEModel(cobra.core.model.Model):
 
 		return None
 
-	def update(self):
-		new = []
-		for r in self.reactions:
-			if hasattr(r, 'update'):
-				new.append(r)
-		for r in tqdm.tqdm(new, 'Updating ME-model Reactions...', bar_format = bar_format):
-			_update(r)
+	def update(self, processes = None, changed = None):
+		"""
+		Update the stoichiometry of every reaction from the process data.
+
+		Parameters
+		----------
+		processes : int, optional
+			Number of worker processes. If larger than 1, reactions are updated
+			in parallel (see `_parallel_update`). By default, reactions are
+			updated serially.
+		changed : list, optional
+			ProcessData, reactions, or their identifiers, and global_info keys
+			modified since the last update. Only the reactions depending on
+			them are updated (see `get_dependency_graph`), and then the
+			reactions consuming metabolites whose formula changed.
+		"""
+		processes = int(processes) if processes is not None and int(processes) > 1 else 1
+		if changed is None:
+			new = []
+			for r in self.reactions:
+				if hasattr(r, 'update'):
+					new.append(r)
+		else:
+			new = self._get_affected_reactions(changed)
+
+		if processes > 1 and sys.platform != 'win32':
+			return self._parallel_update(processes, reactions = new)
+
+		if changed is None:
+			for r in tqdm.tqdm(new, 'Updating ME-model Reactions...', bar_format = bar_format):
+				_update(r)
+			return None
+
+		while new:
+			formulas = { met.id:met.formula for met in self.metabolites }
+			for r in tqdm.tqdm(new, 'Updating ME-model Reactions...', bar_format = bar_format):
+				_update(r)
+			new = self._get_formula_dependents(formulas)
 		return None
 
+	def get_dependency_graph(self, rebuild = False):
+		"""
+		Return the reverse dependencies of the reactions of the ME-model, used
+		by `update(changed = ...)`, as a dictionary with:
+
+			'process_data': { ProcessData ID : set of ProcessData IDs using it
+				as a subreaction or translocation pathway }
+			'reactions': { ProcessData ID : set of reaction IDs reading it,
+				besides the parents in ProcessData._parent_reactions }
+			'global_info': { global_info key : set of reaction IDs reading it }
+
+		The graph is built on first use and kept until reactions or process
+		data are added or removed. Set rebuild to True after modifying the
+		subreactions or translocation pathways of process data in place.
+		"""
+		# ProcessDataList counts modifications, see ProcessDataList._changed
+		version = getattr(self.process_data, '_version', len(self.process_data))
+		graph = getattr(self, '_dependency_graph', None)
+		if graph is not None and not rebuild and graph['version'] == version:
+			return graph
+
+		graph = {
+			'process_data' : collections.defaultdict(set),
+			'reactions' : collections.defaultdict(set),
+			'global_info' : collections.defaultdict(set),
+			'version' : version,
+			}
+		for data in self.process_data:
+			for subreaction in getattr(data, 'subreactions', {}):
+				graph['process_data'][subreaction].add(data.id)
+			if isinstance(data, coralme.core.processdata.PostTranslationData):
+				for pathway in data.translocation:
+					graph['process_data'][pathway].add(data.id)
+
+		for rxn in self.reactions:
+			if not hasattr(rxn, 'update'):
+				continue
+			# complex formation reactions are not parents of their complex data
+			if isinstance(rxn, coralme.core.reaction.ComplexFormation):
+				graph['reactions'][rxn.complex_data_id].add(rxn.id)
+			for data_id in getattr(rxn, '_process_data_ids', []):
+				graph['reactions'][data_id].add(rxn.id)
+			for key in getattr(rxn, '_global_info_keys', []):
+				graph['global_info'][key].add(rxn.id)
+
+		self._dependency_graph = graph
+		return graph
+
+	def _get_affected_reactions(self, changed):
+		# reactions depending on process data, reactions and global_info keys, in the order of the ME-model
+		graph = self.get_dependency_graph()
+		if isinstance(changed, str) or hasattr(changed, 'id'):
+			changed = [ changed ]
+
+		queue = []
+		affected = set()
+		for item in changed:
+			key = item.id if hasattr(item, 'id') else item
+			if self.process_data.has_id(key):
+				queue.append(key)
+			elif self.reactions.has_id(key):
+				affected.add(key)
+			elif key in self.global_info:
+				affected.update(graph['global_info'].get(key, set()))
+			else:
+				raise ValueError('\'{:s}\' is not a ProcessData, a reaction, or a global_info key of the ME-model.'.format(str(key)))
+
+		seen = set(queue)
+		while queue:
+			data_id = queue.pop()
+			affected.update(self.process_data.get_by_id(data_id)._parent_reactions)
+			affected.update(graph['reactions'].get(data_id, set()))
+			for user in graph['process_data'].get(data_id, set()).difference(seen):
+				seen.add(user)
+				queue.append(user)
+
+		return [ rxn for rxn in self.reactions if rxn.id in affected and hasattr(rxn, 'update') ]
+
+	def _get_formula_dependents(self, formulas):
+		# reactions consuming metabolites whose formula changed since `formulas`
+		dependents = set()
+		for met in self.metabolites:
+			if met.formula == formulas.get(met.id, None):
+				continue
+			for rxn in met.reactions:
+				value = rxn.metabolites[met]
+				if hasattr(rxn, 'update') and (hasattr(value, 'subs') or value < 0):
+					dependents.add(rxn.id)
+		return [ rxn for rxn in self.reactions if rxn.id in dependents ]
+
 	# me.update() cannot be paralelized without considering new constraints being added into the model.
 	# New constraints must have a different name, so me.update() fails if two reactions are changed to add the same constraint:
 	# ContainerAlreadyContains: Container '<optlang.container.Container object at 0x...>' already contains an object with name 'Name'.
-	def _parallel_update(self):
-		return NotImplemented
+	def _parallel_update(self, processes, reactions = None, max_waves = 10):
+		"""
+		Update reactions in two phases.
+
+		Phase one updates the reactions in worker processes, each one holding a
+		read-only snapshot of the ME-model, and returns the new stoichiometry,
+		bounds and formulas of products. Phase two applies the results in the
+		order of the reactions. Reactions that create components, constraints,
+		reactions or process data, or that modify other reactions (e.g.,
+		demand reactions of transcripts) are updated serially in phase two.
+
+		Formulas (and biomass coefficients) of products depend on the formulas
+		of reactants set by other reactions. Reactions consuming metabolites
+		whose formula changed are updated again, until formulas do not change
+		or after `max_waves` waves, after which remaining reactions are updated
+		serially.
+
+		If reactions is None, all reactions with an update method are updated
+		in the first wave.
+		"""
+		if reactions is None:
+			reactions = [ r for r in self.reactions if hasattr(r, 'update') ]
+		todo = reactions
+		wave = 0
+		while todo:
+			if wave == max_waves:
+				logging.warning('Formulas did not converge after {:d} waves. Updating {:d} reactions serially.'.format(max_waves, len(todo)))
+				for rxn in todo:
+					_update(rxn)
+				break
+
+			# phase one
+			ids = [ rxn.id for rxn in todo ]
+			chunksize = -(-len(ids) // (4 * processes))
+			tasks = [ ids[idx:idx + chunksize] for idx in range(0, len(ids), chunksize) ]
+			formulas = { met.id:met.formula for met in self.metabolites }
+
+			results = {}
+			desc = 'Updating ME-model Reactions...' if wave == 0 else 'Updating ME-model Reactions (wave {:d})...'.format(wave)
+			from coralme.solver.solver import _get_pool
+			with _get_pool(processes, _init_update_worker, (self, wave == 0)) as pool:
+				for res in tqdm.tqdm(pool.imap_unordered(_update_worker, tasks), desc, total = len(tasks), bar_format = bar_format):
+					results.update({ x[0]:x[1:] for x in res })
+
+			# phase two
+			for rxn in todo:
+				stoichiometry, bounds, products = results[rxn.id]
+				if stoichiometry is None:
+					_update(rxn)
+					continue
+
+				if { met.id:value for met, value in rxn.metabolites.items() } != stoichiometry:
+					rxn.clear_metabolites()
+					rxn.add_metabolites(rxn.get_components_from_ids(stoichiometry, verbose = False), combine = False)
+				for met_id, formula in products.items():
+					self.metabolites.get_by_id(met_id).formula = formula
+				if rxn.bounds != bounds:
+					rxn.bounds = bounds
+
+			todo = self._get_formula_dependents(formulas)
+			wave += 1
+
+		return None
 
 	def get(self, x: typing.Union[cobra.core.object.Object, str]) -> cobra.core.object.Object:
 		"""
@@ -1088,54 +1584,258 @@ class MEModel(cobra.core.model.Model):
 		return res
 
 	def construct_lp_problem(self, lambdify = False):
-		# populate empty dictionaries with stoichiometry
+		"""
+		Return the LP problem of the ME-model as dictionaries of stoichiometric
+		coefficients, (Sf, Se, lb, ub, b, c, cs, atoms, lambdas).
+
+		The representation is kept between calls. Methods that modify the
+		ME-model flag the affected reactions (see `_mark_lp_dirty`), and only
+		their columns are extracted again. Removing reactions or metabolites
+		shifts indices and the LP is assembled again from the stored columns.
+		"""
+		cache = MEModel._get_lp_cache(self)
+
+		# copies, callers modify the LP problem (e.g., evaluate_lp_problem)
+		Sf = dict(cache['Sf'])
+		Se = dict(cache['Se'])
+		lb = list(cache['lb'])
+		ub = list(cache['ub'])
+		b = [ m._bound for m in self.metabolites ] # accumulation
+		c = list(cache['c'])
+		cs = list(cache['cs'])
+		atoms = set(cache['atoms'])
+
+		if lambdify:
+			# bounds are kept as expressions; ME_NLP compiles them with the stoichiometry
+			# interned coefficients are compiled once and the functions are shared
+			fns = {}
+			lambdas = {}
+			for key, value in Se.items():
+				fn = fns.get(value, None)
+				if fn is None:
+					fn = fns[value] = sympy.lambdify(list(atoms), value)
+				lambdas[key] = fn
+		else:
+			lambdas = None
+
+		return Sf, Se, lb, ub, b, c, cs, atoms, lambdas
+
+	def _get_lp_cache(self):
+		# bring the stored LP problem up to date with the ME-model
+		cache = getattr(self, '_lp_cache', None)
+		dirty = getattr(self, '_lp_dirty', set())
+
+		try:
+			if cache is None:
+				cache = MEModel._build_lp_cache(self, set(), {})
+			elif cache['reindex'] or len(self.reactions) < len(cache['lb']) or len(self.metabolites) < len(cache['cs']):
+				cache = MEModel._build_lp_cache(self, dirty, cache['columns'])
+			else:
+				if dirty or len(self.reactions) != len(cache['lb']) or len(self.metabolites) != len(cache['cs']):
+					# templates and solver models, see `_compile_lp`
+					cache.pop('compiled', None)
+				MEModel._update_lp_cache(self, cache, dirty)
+		except (KeyError, ValueError):
+			# identifiers changed without notice
+			cache = MEModel._build_lp_cache(self, set(), {})
+
+		if isinstance(self, MEModel):
+			self._lp_cache = cache
+			self._lp_dirty = set()
+		return cache
+
+	def _compile_lp(self):
+		"""
+		Return a dictionary with the stoichiometry ('S') and the bounds ('lb'
+		and 'ub') of the LP problem compiled into growth rate templates. The
+		dictionary is also used to keep solver models alive between calls, and
+		it is discarded when the ME-model changes.
+		"""
+		cache = self._get_lp_cache()
+		compiled = cache.setdefault('compiled', {})
+		if 'S' not in compiled:
+			from coralme.solver.template import GrowthRateTemplate, MatrixTemplate
+			atoms = cache['atoms'] | { self.mu }
+			entries = dict(cache['Sf'])
+			entries.update(cache['Se'])
+			# interned coefficients are split once
+			split = self._get_coefficients().split_coefficient
+			compiled['S'] = MatrixTemplate(entries, (len(cache['cs']), len(cache['lb'])), atoms, split = split)
+			compiled['lb'] = GrowthRateTemplate(cache['lb'], atoms, split = split)
+			compiled['ub'] = GrowthRateTemplate(cache['ub'], atoms, split = split)
+		return compiled
+
+	def _evaluate_lp(self, mu, lp = None):
+		# stoichiometric matrix (CSC), bounds and accumulation at growth rate mu
+		compiled = self._compile_lp()
+		Sp = compiled['S'].tocsc(mu)
+		if lp is None:
+			lb = compiled['lb'].evaluate(mu)
+			ub = compiled['ub'].evaluate(mu)
+		else:
+			# bounds modified by the caller, e.g., closed sink reactions in `brute_force_check`
+			lb = numpy.array([ float(x.subs(self.mu, mu)) if hasattr(x, 'subs') else float(x) for x in lp[2] ])
+			ub = numpy.array([ float(x.subs(self.mu, mu)) if hasattr(x, 'subs') else float(x) for x in lp[3] ])
+		b = numpy.array([ float(x.subs(self.mu, mu)) if hasattr(x, 'subs') else float(x) for x in self.metabolites.list_attr('_bound') ])
+		return compiled, Sp, lb, ub, b
+
+	@staticmethod
+	def _get_lp_column(rxn, atoms):
+		# stoichiometry of a reaction as { metabolite ID : coefficient }
+		column = {}
+		for met, value in rxn.metabolites.items():
+			if hasattr(value, 'subs'):
+				atoms.add(list(value.free_symbols)[0])
+			column[met.id] = value
+		return column
+
+	def _build_lp_cache(self, dirty, columns):
+		# assemble the LP from the columns of unchanged reactions and extract
+		# only the columns of new or dirty reactions
 		Sf = dict() # floats
 		Se = dict() # expressions
 
 		# check how many variables are in the ME-model
 		atoms = set()
+		for column in columns.values():
+			for value in column.values():
+				if hasattr(value, 'subs'):
+					atoms.add(list(value.free_symbols)[0])
 
+		met_index = MEModel.metabolite_index.fget(self)
+		new_columns = {}
 		for idx, rxn in enumerate(self.reactions):
-			for met, value in rxn.metabolites.items():
-				met_index = self.metabolites.index(met)
+			if rxn.id in dirty or rxn.id not in columns:
+				column = MEModel._get_lp_column(rxn, atoms)
+			else:
+				column = columns[rxn.id]
+			new_columns[rxn.id] = column
+
+			for met_id, value in column.items():
 				if hasattr(value, 'subs'):
-					atoms.add(list(value.free_symbols)[0])
-					Se[met_index, idx] = value
+					Se[met_index[met_id], idx] = value
 				else:
-					Sf[met_index, idx] = value
+					Sf[met_index[met_id], idx] = value
+
+		lb, ub = zip(*[ rxn.bounds for rxn in self.reactions ]) if len(self.reactions) != 0 else ([], [])
+
+		return {
+			'columns' : new_columns,
+			'Sf' : Sf,
+			'Se' : Se,
+			'lb' : list(lb),
+			'ub' : list(ub),
+			'c' : [ r.objective_coefficient for r in self.reactions ],
+			# constraint sense eventually will be in the metabolite object
+			'cs' : [ 'E' for m in self.metabolites ],
+			'atoms' : atoms,
+			'reindex' : False,
+			}
 
-		lb, ub = zip(*[ rxn.bounds for rxn in self.reactions ])
-		b = [ m._bound for m in self.metabolites ] # accumulation
-		c = [ r.objective_coefficient for r in self.reactions ]
-		# constraint sense eventually will be in the metabolite object
-		cs = [ 'E' for m in self.metabolites ]
+	def _update_lp_cache(self, cache, dirty):
+		# reactions and metabolites added since the last call were appended
+		dirty = set(dirty)
+		for idx in range(len(cache['lb']), len(self.reactions)):
+			rxn = self.reactions[idx]
+			cache['lb'].append(rxn.lower_bound)
+			cache['ub'].append(rxn.upper_bound)
+			cache['c'].append(rxn.objective_coefficient)
+			dirty.add(rxn.id)
+		cache['cs'].extend([ 'E' ] * (len(self.metabolites) - len(cache['cs'])))
+
+		Sf = cache['Sf']
+		Se = cache['Se']
+		met_index = MEModel.metabolite_index.fget(self)
+		rxn_index = MEModel.reaction_index.fget(self)
+		for rxn_id in dirty:
+			if rxn_id not in rxn_index:
+				continue
+			idx = rxn_index[rxn_id]
+			rxn = self.reactions[idx]
 
-		if lambdify:
-			fn = numpy.vectorize(lambda x: sympy.lambdify(list(atoms), x))
-			lb = [ x for x in fn(lb) ]
-			ub = [ x for x in fn(ub) ]
-			lambdas = { k:v for k,v in zip(Se.keys(), fn(list(Se.values()))) }
-		else:
-			lambdas = None
+			for met_id in cache['columns'].get(rxn_id, {}):
+				jdx = met_index.get(met_id, None)
+				Sf.pop((jdx, idx), None)
+				Se.pop((jdx, idx), None)
+
+			column = MEModel._get_lp_column(rxn, cache['atoms'])
+			cache['columns'][rxn_id] = column
+			for met_id, value in column.items():
+				if hasattr(value, 'subs'):
+					Se[met_index[met_id], idx] = value
+				else:
+					Sf[met_index[met_id], idx] = value
 
-		return Sf, Se, list(lb), list(ub), b, c, cs, atoms, lambdas
+			cache['lb'][idx], cache['ub'][idx] = rxn.bounds
+			cache['c'][idx] = rxn.objective_coefficient
 
-	def rank(self, mu = 0.001):
-		Sf, Se, lb, ub, b, c, cs, atoms, lambdas = self.construct_lp_problem()
-		Sp = scipy.sparse.dok_matrix((len(b), len(c)))
+	def _mark_lp_dirty(self, reactions = None, reindex = False):
+		"""
+		Flag the columns of `reactions` to be extracted again by
+		`construct_lp_problem`. If reactions is None, the LP is extracted again
+		from the whole ME-model. Set reindex if reactions or metabolites were
+		removed from the ME-model.
+		"""
+		if reactions is None or reindex:
+			# the structure of the ME-model changed, see `get_structure_hash`
+			self._structure_hash = None
+		if getattr(self, '_lp_cache', None) is None:
+			return None
+		if reactions is None:
+			self._lp_cache = None
+			self._lp_dirty = set()
+			return None
+
+		if not hasattr(self, '_lp_dirty'):
+			self._lp_dirty = set()
+		for rxn in reactions:
+			self._lp_dirty.add(rxn if isinstance(rxn, str) else rxn.id)
+		if reindex:
+			self._lp_cache['reindex'] = True
+
+	def to_sparse(self, mu, format = 'csc', dtype = numpy.float64):
+		"""
+		Return the stoichiometric matrix at growth rate `mu` as a scipy.sparse
+		matrix.
+
+		The matrix is built from the LP representation kept by
+		`construct_lp_problem`. Symbolic coefficients are compiled once into a
+		template and evaluated as a vectorized kernel, until the ME-model
+		changes again.
+
+		Parameters
+		----------
+		mu : float
+			Growth rate to replace in the symbolic coefficients.
+		format : str, {"csc", "csr", "coo"}
+			Sparse format of the returned matrix.
+		dtype : numpy.dtype
+			Type of the values, e.g., numpy.float32, numpy.float64 or
+			numpy.longdouble.
+		"""
+		if format not in [ 'csc', 'csr', 'coo' ]:
+			raise ValueError('The \'format\' must be \'csc\', \'csr\' or \'coo\'.')
 
-		for idx, idj in Sf.keys():
-		    Sp[idx, idj] = Sf[idx, idj]
+		template = self._compile_lp()['S']
+		template.evaluate(mu, out = template.data)
+		matrix = scipy.sparse.csc_matrix(
+			(template.data.astype(dtype), template.indices.copy(), template.indptr.copy()),
+			shape = template.shape, copy = False)
 
-		for idx, idj in Se.keys():
-		    Sp[idx, idj] = float(Se[idx, idj].subs({ self.mu : mu }))
+		if format == 'csr':
+			return matrix.tocsr()
+		elif format == 'coo':
+			return matrix.tocoo()
+		return matrix
 
-		return numpy.linalg.matrix_rank(Sp.todense())
+	def rank(self, mu = 0.001):
+		return numpy.linalg.matrix_rank(self.to_sparse(mu).toarray())
 
 	def fva(self,
 		reaction_list, fraction_of_optimum, mu_fixed = None, objective = 'biomass_dilution',
 		max_mu = 2.8100561374051836, min_mu = 0., maxIter = 100, lambdify = True,
-		tolerance = 1e-6, precision = 'quad', verbose = True):
+		tolerance = 1e-6, precision = 'quad', verbose = True,
+		processes = None, chunksize = None, callback = None, checkpoint = None, prune = True):
 
 		"""
 		Determine the minimum and maximum flux value for each reaction constrained
@@ -1171,6 +1871,27 @@ class MEModel(cobra.core.model.Model):
 
 		verbose : bool
 			If True, allow printing.
+		processes : int, optional
+			If greater than 1, reactions are split into chunks and varied in a
+			process pool, one qMINOS instance per worker. All workers start
+			from the same (stored) optimal basis.
+		chunksize : int, optional
+			Number of reactions per chunk. Defaults to four chunks per process.
+		callback : function, optional
+			Called as callback(number of reactions done, total number of
+			reactions) after each chunk finishes.
+		checkpoint : str, optional
+			Path to a JSON file to save the results of finished chunks. If the
+			file exists, reactions already saved are not varied again. The file
+			also records the growth rate, fraction of optimum, objective,
+			structure of the model (see `get_structure_hash`) and a hash of the
+			stoichiometry, bounds and right-hand side of the LP problem, and a
+			ValueError is raised if they differ from the current problem.
+		prune : bool
+			If True, reactions with fixed bounds or blocked by deadend
+			metabolites are not varied, and only one reaction per group of
+			fully coupled reactions is varied (see
+			`coralme.builder.helper_functions.get_fva_pruning`).
 		"""
 
 		# max_mu is constrained by the fastest-growing bacterium (14.8 doubling time)
@@ -1220,24 +1941,90 @@ class MEModel(cobra.core.model.Model):
 			else:
 				rxns_fva.append(rxn)
 
-		obj_inds0 = [ self.reactions.index(rxn) for rxn in rxns_fva for j in range(0, 2) ]
-		obj_coeffs = [ ci for rxn in rxns_fva for ci in (1.0, -1.0) ]
+		# resume from the reactions saved in the checkpoint file, only for the same problem
+		problem = {
+			'mu_fixed' : float(mu_fixed),
+			'fraction_of_optimum' : float(fraction_of_optimum),
+			'objective' : str(objective),
+			'structure' : coralme.core.model.MEModel.get_structure_hash(self),
+			'values' : _get_lp_digest(Sf, Se, lb, ub, b, c),
+			}
+		done = {}
+		if checkpoint is not None and os.path.isfile(checkpoint):
+			with open(checkpoint, 'r') as infile:
+				saved = json.load(infile)
+			saved_problem = saved.get('problem', {}) if isinstance(saved, dict) else {}
+			mismatch = [ key for key, value in problem.items() if saved_problem.get(key, None) != value ]
+			if mismatch:
+				raise ValueError('The checkpoint file \'{:s}\' was saved for a different FVA problem (mismatch in {:s}). Remove it or use another file.'.format(checkpoint, ', '.join(mismatch)))
+			done = saved['results']
+
+		# reactions settled without solving
+		fixed, coupled = {}, {}
+		if prune:
+			growth_key = self.mu if hasattr(self, 'mu') else sympy.Symbol('mu', positive = True)
+			fixed, coupled = coralme.builder.helper_functions.get_fva_pruning(self, rxns_fva, mu_fixed, growth_key = growth_key)
+			if verbose:
+				print('{:d} reactions have fixed fluxes and {:d} reactions are fully coupled to other reactions.'.format(len(fixed), len(coupled)))
+
+		todo = []
+		seen = set(done.keys()).union(fixed.keys()).union(coupled.keys())
+		for rxn in rxns_fva:
+			if rxn.id not in seen:
+				todo.append(rxn)
+				seen.add(rxn.id)
+
+		processes = int(processes) if processes is not None and int(processes) > 1 else 1
+		if chunksize is None:
+			chunksize = len(todo) if processes == 1 else -(-len(todo) // (4 * processes))
+		chunksize = max(1, int(chunksize))
+
+		# warm-start from a stored basis of the ME-model (not available for M-models)
+		basis = self.get_basis(mu_fixed) if hasattr(self, 'get_basis') else None
+
+		tasks = []
+		for idx in range(0, len(todo), chunksize):
+			chunk = todo[idx:idx + chunksize]
+			obj_inds0 = [ self.reactions.index(rxn) for rxn in chunk for j in range(0, 2) ]
+			obj_coeffs = [ ci for rxn in chunk for ci in (1.0, -1.0) ]
+			tasks.append((mu_fixed, obj_inds0, obj_coeffs, basis))
+
+		def merge(obj_inds0, nVary, obj_vals):
+			for i in range(0, nVary//2):
+				done[self.reactions[obj_inds0[2*i]].id] = {
+					'maximum':float(obj_vals[2*i]),
+					'minimum':float(obj_vals[2*i+1])
+					}
+			if checkpoint is not None:
+				with open(checkpoint, 'w') as outfile:
+					json.dump({ 'problem' : problem, 'results' : done }, outfile)
+			if callback is not None:
+				callback(len([ x for x in rxns_fva if x.id in done ]), len(rxns_fva))
 
 		# varyME is a specialized method for multiple min/maximization problems
-		obj_inds0, nVary, obj_vals = me_nlp.varyme(mu_fixed, obj_inds0, obj_coeffs, basis = None, verbosity = verbose)
+		if processes > 1 and len(tasks) > 1:
+			from coralme.solver.solver import _get_pool, _init_worker, _varyme_worker
+			me_nlp.update_lp(mu_fixed)
+			with _get_pool(processes, _init_worker, (me_nlp,)) as pool:
+				for res in pool.imap_unordered(_varyme_worker, tasks):
+					merge(*res)
+		else:
+			for mu_fixed, obj_inds0, obj_coeffs, basis in tasks:
+				merge(*me_nlp.varyme(mu_fixed, obj_inds0, obj_coeffs, basis = basis, verbosity = verbose))
+
+		done.update(fixed)
+		for rxn_id, (representative, ratio) in coupled.items():
+			values = [ done[representative]['maximum'] * ratio, done[representative]['minimum'] * ratio ]
+			done[rxn_id] = { 'maximum' : max(values), 'minimum' : min(values) }
 
 		# Return result consistent with cobrapy FVA
-		fva_result = {
-			(self.reactions[obj_inds0[2*i]].id): {
-				'maximum':obj_vals[2*i],
-				'minimum':obj_vals[2*i+1]
-				} for i in range(0, nVary//2) }
+		fva_result = { rxn.id:done[rxn.id] for rxn in rxns_fva }
 
 		return pandas.DataFrame(fva_result).T
 
 	def optimize(self,
 		max_mu = 2.8100561374051836, min_mu = 0., maxIter = 100, lambdify = True,
-		tolerance = 1e-6, precision = 'quad', verbose = True):
+		tolerance = 1e-6, precision = 'quad', verbose = True, parallel = None, basis = None):
 
 		"""Solves the NLP problem to obtain reaction fluxes for a ME-model.
 
@@ -1258,6 +2045,12 @@ class MEModel(cobra.core.model.Model):
 			Precision (quad or double precision) for the GRBS
 		verbose : bool
 			If True, allow printing.
+		parallel : int, optional
+			If greater than 1, replace the GRBS with a k-section search that
+			evaluates `parallel` growth rates at once in a process pool.
+		basis : numpy.array, optional
+			Basis to warm-start qMINOS. If None, the stored basis with the
+			nearest growth rate is used (see `get_basis`).
 		"""
 
 		# max_mu is constrained by the fastest-growing bacterium (14.8 min, doubling time)
@@ -1282,13 +2075,28 @@ class MEModel(cobra.core.model.Model):
 		from coralme.solver.solver import ME_NLP
 		me_nlp = ME_NLP(Sf, Se, b, c, lb, ub, cs, atoms, lambdas)
 
-		muopt, xopt, yopt, zopt, basis, stat = me_nlp.bisectmu(
-				mumax = max_mu,
-				mumin = min_mu,
-				maxIter = maxIter,
-				tolerance = tolerance,
-				precision = precision,
-				verbose = verbose)
+		if basis is None:
+			basis = self.get_basis(max_mu)
+
+		if parallel is not None and int(parallel) > 1:
+			muopt, xopt, yopt, zopt, basis, stat = me_nlp.ksectmu(
+					mumax = max_mu,
+					mumin = min_mu,
+					basis = basis,
+					k = int(parallel),
+					maxIter = maxIter,
+					tolerance = tolerance,
+					precision = precision,
+					verbose = verbose)
+		else:
+			muopt, xopt, yopt, zopt, basis, stat = me_nlp.bisectmu(
+					mumax = max_mu,
+					mumin = min_mu,
+					basis = basis,
+					maxIter = maxIter,
+					tolerance = tolerance,
+					precision = precision,
+					verbose = verbose)
 
 		if stat == 'optimal':
 			#f = sum([ rxn.objective_coefficient * xopt[idx] for idx, rxn in enumerate(self.reactions) ])
@@ -1308,12 +2116,108 @@ class MEModel(cobra.core.model.Model):
 				reduced_costs = z_dict,
 				shadow_prices = y_dict,
 				)
+			self.basis = basis
+			self.store_basis(muopt, basis)
 			return True
 		else:
 			if hasattr(self, 'solution'):
 				del self.solution
 			return False
 
+	def sweep(self, conditions,
+		max_mu = 2.8100561374051836, min_mu = 0., maxIter = 100,
+		tolerance = 1e-6, precision = 'quad', processes = None, filename = None,
+		callback = None, verbose = True):
+
+		"""Solves the ME-model under many conditions (media, knockouts or
+		bound changes) in a process pool.
+
+		The LP problem is constructed and compiled once. Each condition is
+		applied as a change of reaction bounds on the compiled problem, and
+		the conditions are solved in parallel with one qMINOS instance per
+		worker. The last optimal basis of each worker warm-starts its next
+		condition.
+
+		Parameters
+		----------
+		conditions : dict
+			Dictionary of { condition name : { reaction or reaction id : (lower_bound, upper_bound) } }
+		max_mu : float
+			Maximum growth rate for initializing the growth rate binary search (GRBS).
+		min_mu : float
+			Minimum growth rate for initializing GRBS.
+		maxIter : int
+			Maximum number of iterations for GRBS.
+		tolerance : float
+			Tolerance for the convergence of GRBS.
+		precision : str, {"quad", "double", "dq", "dqq"}
+			Precision (quad or double precision) for the GRBS
+		processes : int, optional
+			Number of worker processes. Defaults to the number of CPUs.
+		filename : str, optional
+			Path to a .npy file to store the fluxes as results arrive.
+		callback : function, optional
+			Called as callback(condition name, cobra.core.Solution) as soon
+			as each condition finishes. The solution is None if the condition
+			is not feasible.
+		verbose : bool
+			If True, allow printing.
+
+		Returns
+		-------
+		:class:`coralme.core.model.SweepResults`
+		"""
+
+		# check options
+		min_mu = min_mu if min_mu >= 0. else 0.
+		max_mu = max_mu if max_mu <= 2.8100561374051836 else 2.8100561374051836
+		tolerance = tolerance if tolerance >= 1e-15 else 1e-6
+		precision = precision if precision in [ 'quad', 'double', 'dq', 'dqq' ] else 'quad'
+
+		# populate with stoichiometry, no replacement of mu's; the LP problem is compiled only once
+		Sf, Se, lb, ub, b, c, cs, atoms, lambdas = self.construct_lp_problem(lambdify = False)
+
+		from coralme.solver.solver import ME_NLP, _get_pool, _init_sweep_worker, _sweep_worker
+		me_nlp = ME_NLP(Sf, Se, b, c, lb, ub, cs, atoms, None)
+		me_nlp.init_lp()
+
+		tasks = []
+		for name, bounds in conditions.items():
+			indices = [ self.reactions.index(rxn) for rxn in bounds.keys() ]
+			lbs = [ x[0] for x in bounds.values() ]
+			ubs = [ x[1] for x in bounds.values() ]
+			tasks.append((name, indices, lbs, ubs, min_mu, max_mu, maxIter, tolerance, precision))
+
+		rxn_ids = self.reactions.list_attr('id')
+		met_ids = self.metabolites.list_attr('id')
+		results = SweepResults(conditions.keys(), rxn_ids, filename = filename)
+
+		initargs = (me_nlp, self.get_basis(max_mu))
+		with _get_pool(processes, _init_sweep_worker, initargs) as pool:
+			for idx, (name, muopt, xopt, yopt, zopt, basis, stat) in enumerate(pool.imap_unordered(_sweep_worker, tasks)):
+				results.add(name, muopt, stat, xopt[ 0:len(rxn_ids) ])
+
+				if stat == 'optimal':
+					solution = cobra.core.Solution(
+						objective_value = muopt,
+						status = stat,
+						fluxes = pandas.Series(xopt[ 0:len(rxn_ids) ], index = rxn_ids),
+						reduced_costs = pandas.Series(zopt[ 0:len(rxn_ids) ], index = rxn_ids),
+						shadow_prices = pandas.Series(yopt[ 0:len(met_ids) ], index = met_ids),
+						)
+				else:
+					solution = None
+
+				if verbose:
+					print('{:s}/{:d}\t{:s}\t{:s}'.format(str(idx + 1).rjust(len(str(len(tasks)))), len(tasks), str(name),
+						'Optimal ({:.16f})'.format(muopt) if stat == 'optimal' else 'Not feasible'))
+
+				if callback is not None:
+					callback(name, solution)
+
+		results.flush()
+		return results
+
 	# WARNING: Experimental. We could not compile qminos under WinOS, and qminos has a licence restriction for its source code
 	def optimize_windows(self,
 		max_mu = 2.8100561374051836, min_mu = 0., maxIter = 100, lambdify = True,
@@ -1332,41 +2236,37 @@ class MEModel(cobra.core.model.Model):
 		maxIter : int
 			Maximum number of iterations for GRBS.
 		lambdify : bool
-			If True, returns a dictionary of lambda functions for each symbolic
-   			stoichiometric coefficient
+			Unused. The backends compile the symbolic stoichiometric
+			coefficients once and keep them between feasibility checks.
 		tolerance : float
 			Tolerance for the convergence of GRBS.
 		precision : str, {"quad", "double", "dq", "dqq"}
 			Precision (quad or double precision) for the GRBS
 		verbose : bool
 			If True, allow printing.
+		solver : str, {"gurobi", "cplex", "highs"}
+			Solver for the feasibility checks. HiGHS is open-source and solves
+			in double precision only.
 		"""
 
 		# check options
 		tolerance = tolerance if tolerance >= 1e-15 else 1e-6
-		solver = solver if solver in [ 'gurobi', 'cplex' ] else 'gurobi'
+		solver = solver if solver in [ 'gurobi', 'cplex', 'highs' ] else 'gurobi'
 
-		if solver == 'gurobi':
-			self.check_feasibility = self.feas_gurobi
-		elif solver == 'cplex':
-			self.check_feasibility = self.feas_cplex
-		else:
-			print('The \'solver\' must be \'gurobi\' or \'cplex\'.')
+		self.check_feasibility = self.feas_windows(solver = solver)
+		if self.check_feasibility is None:
 			return None
 
-		# populate with stoichiometry with replacement of mu's (Sf contains Se)
-		# for multiple evaluations of the LP problem, replacement in lambdify'ed Se is faster overall
-		Sf, Se, lb, ub, b, c, cs, atoms, lambdas = self.construct_lp_problem(lambdify = lambdify)
-
+		# the LP problem is compiled once and kept by the backends between feasibility checks
 		# test max_mu
-		self.check_feasibility(keys = { self.mu:max_mu }, precision = 'quad', **{ 'lp' : [Sf, Se, lb, ub, b, c, cs, atoms, lambdas] })
+		self.check_feasibility(keys = { self.mu:max_mu }, precision = 'quad')
 		if hasattr(self, 'solution') and self.solution.status == 'optimal':
 			return True
 		else:
 			for idx in range(1, maxIter + 1):
 				# Just a sequence of feasibility checks
 				muf = (min_mu + max_mu) / 2.
-				self.check_feasibility(keys = { self.mu:muf }, precision = 'quad', **{ 'lp' : [Sf, Se, lb, ub, b, c, cs, atoms, lambdas] })
+				self.check_feasibility(keys = { self.mu:muf }, precision = 'quad')
 
 				if hasattr(self, 'solution') and self.solution.status == 'optimal':
 					stat_new = 'optimal'
@@ -1389,12 +2289,23 @@ class MEModel(cobra.core.model.Model):
 			return self.feas_gurobi
 		elif solver == 'cplex':
 			return self.feas_cplex
+		elif solver == 'highs':
+			return self.feas_highs
 		else:
-			print('The \'solver\' must be \'gurobi\' or \'cplex\'.')
+			print('The \'solver\' must be \'gurobi\', \'cplex\' or \'highs\'.')
 			return None
 
 	# WARNING: Experimental. We could not compile qminos under WinOS, and qminos has a licence restriction for its source code
 	def feas_cplex(self, keys = { sympy.Symbol('mu', positive = True) : 0.1 }, **kwargs):
+		"""
+		Check the feasibility of the ME-model at a fixed growth rate using
+		CPLEX through docplex.
+
+		The docplex model is assembled once from the CSR matrix and kept until
+		the ME-model changes. Successive calls only change the growth
+		rate-dependent coefficients and bounds. Only the bounds are read from
+		the 'lp' keyword; the stoichiometry is always that of the ME-model.
+		"""
 		# check options
 		for key in list(keys.keys()):
 			if isinstance(key, sympy.Symbol):
@@ -1402,48 +2313,48 @@ class MEModel(cobra.core.model.Model):
 			else:
 				keys[sympy.Symbol(key, positive = True)] = keys.pop(key)
 
-		# populate with stoichiometry with replacement of mu's (Sf contains Se)
-		# for single evaluations of the LP problem, direct replacement is faster than lambdify
-		Sf, Se, lb, ub, b, c, cs, atoms, lambdas = kwargs.get('lp', self.construct_lp_problem(lambdify = False))
+		muf = float(list(keys.values())[0])
+		compiled, Sp, lb, ub, b = self._evaluate_lp(muf, kwargs.get('lp', None))
 
-		if lambdas is None:
-			Sf, Se, lb, ub = coralme.builder.helper_functions.evaluate_lp_problem(Sf, Se, lb, ub, keys, atoms)
-		else:
-			Sf, Se, lb, ub = coralme.builder.helper_functions.evaluate_lp_problem(Sf, lambdas, lb, ub, keys, atoms)
+		if 'cplex' not in compiled:
+			# AdvModel provides the batch APIs (matrix_constraints)
+			from docplex.mp.advmodel import AdvModel as Model
 
-		from docplex.mp.model import Model
+			# create a cplex model
+			mpModel = Model(float_precision = 17)
 
-		# create a cplex model
-		mpModel = Model(float_precision = 17)
+			# Define decision variables
+			x = mpModel.continuous_var_list(len(lb), lb = lb.tolist(), ub = ub.tolist(), name = self.reactions.list_attr('id'))
 
-		# Define decision variables
-		x = {}
-		for idx, rxn in enumerate(self.reactions):
-			x[idx] = mpModel.continuous_var(lb = lb[idx], ub = ub[idx], name = rxn.id)
+			# Set objective function
+			lst = [ x[idx] for idx, rxn in enumerate(self.reactions) if rxn.objective_coefficient != 0 ]
+			mpModel.maximize(mpModel.sum(lst))
 
-		# Set objective function
-		lst = [ x[idx] for idx, rxn in enumerate(self.reactions) if rxn.objective_coefficient != 0 ]
-		mpModel.maximize(mpModel.sum(lst))
+			# Add constraints for system of linear equations
+			constraints = mpModel.add_constraints(mpModel.matrix_constraints(Sp.tocoo(), x, b.tolist(), sense = 'eq'), names = self.metabolites.list_attr('id'))
+			compiled['cplex'] = (mpModel, x, constraints, b)
+		else:
+			mpModel, x, constraints, b0 = compiled['cplex']
 
-		# Add constraints for system of linear equations
-		for jdx, met in enumerate(self.metabolites):
-			lhs = mpModel.linear_expr()
-			for idx, rxn in enumerate(self.reactions):
-				if (jdx, idx) in Sf: # Sf is a dictionary
-					lhs += Sf[(jdx, idx)] * x[idx]
-			mpModel.add_constraint(lhs == 0, ctname = met.id)
+			mpModel.change_var_lower_bounds(x, lb.tolist())
+			mpModel.change_var_upper_bounds(x, ub.tolist())
+			for jdx in numpy.flatnonzero(b != b0):
+				constraints[jdx].rhs = b[jdx]
+			rows, cols, values = self._get_lp_coefficients(compiled, Sp)
+			for jdx, idx, value in zip(rows, cols, values):
+				constraints[jdx].lhs.set_coefficient(x[idx], value)
+			compiled['cplex'] = (mpModel, x, constraints, b)
 
 		mpModel.solve()
 
 		# output solution
 		if mpModel.solve_details.status == 'optimal':
-			#x_primal = gpModel.x[ 0:len(self.reactions) ]
-			x_dict = { rxn.id:mpModel.get_var_by_name(rxn.id).solution_value for idx,rxn in enumerate(self.reactions) }
-			y_dict = { met.id:mpModel.get_constraint_by_name(met.id).dual_value for idx,met in enumerate(self.metabolites) }
-			z_dict = { rxn.id:mpModel.get_var_by_name(rxn.id).reduced_cost for idx,rxn in enumerate(self.reactions) }
+			x_dict = dict(zip(self.reactions.list_attr('id'), mpModel.solution.get_values(x)))
+			y_dict = dict(zip(self.metabolites.list_attr('id'), mpModel.dual_values(constraints)))
+			z_dict = dict(zip(self.reactions.list_attr('id'), mpModel.reduced_costs(x)))
 
 			self.solution = cobra.core.Solution(
-				objective_value = list(keys.values())[0],
+				objective_value = muf,
 				status = 'optimal',
 				fluxes = x_dict,
 				shadow_prices = y_dict,
@@ -1457,6 +2368,16 @@ class MEModel(cobra.core.model.Model):
 
 	# WARNING: Experimental. We could not compile qminos under WinOS, and qminos has a licence restriction for its source code
 	def feas_gurobi(self, keys = { sympy.Symbol('mu', positive = True) : 0.1 }, precision = 'quad', **kwargs):
+		"""
+		Check the feasibility of the ME-model at a fixed growth rate using
+		Gurobi.
+
+		The gurobi model is assembled once from the CSR matrix (addMConstr) and
+		kept until the ME-model changes. Successive calls only change the
+		growth rate-dependent coefficients and bounds, and Gurobi warm-starts
+		from the previous basis. Only the bounds are read from the 'lp'
+		keyword; the stoichiometry is always that of the ME-model.
+		"""
 		# check options
 		precision = precision if precision in [ 'quad', None, False ] else 'quad'
 
@@ -1466,66 +2387,124 @@ class MEModel(cobra.core.model.Model):
 			else:
 				keys[sympy.Symbol(key, positive = True)] = keys.pop(key)
 
-		# populate with stoichiometry with replacement of mu's (Sf contains Se)
-		# for single evaluations of the LP problem, direct replacement is faster than lambdify
-		Sf, Se, lb, ub, b, c, cs, atoms, lambdas = kwargs.get('lp', self.construct_lp_problem(lambdify = False))
-
-		if lambdas is None:
-			Sf, Se, lb, ub = coralme.builder.helper_functions.evaluate_lp_problem(Sf, Se, lb, ub, keys, atoms)
-		else:
-			Sf, Se, lb, ub = coralme.builder.helper_functions.evaluate_lp_problem(Sf, lambdas, lb, ub, keys, atoms)
+		muf = float(list(keys.values())[0])
+		compiled, Sp, lb, ub, b = self._evaluate_lp(muf, kwargs.get('lp', None))
 
 		import gurobipy as gp
 		from gurobipy import GRB
 
-		# create a gurobi model
-		gpModel = gp.Model()
-
-		# Set params
-		gpModel.Params.OutputFlag = 0
-		gpModel.Params.Presolve = 0
-		if precision == 'quad':
-			gpModel.Params.Quad = 1
-		gpModel.Params.NumericFocus = 3
-		gpModel.Params.FeasibilityTol = 1e-9
-		gpModel.Params.IntFeasTol = 1e-9
-		gpModel.Params.OptimalityTol = 1e-9
-		gpModel.Params.Method = 0
-		gpModel.Params.BarQCPConvTol = 1.
-		#gpModel.Params.PivotTolG = 10.
-		#gpModel.Params.UpdateTol = 10.
-		#gpModel.Params.SingularTol = 1e-30
-		gpModel.Params.BarHomogeneous = 1.
-
-		# Define decision variables
-		x = {}
-		for idx, rxn in enumerate(self.reactions):
-			x[idx] = gpModel.addVar(lb = lb[idx], ub = ub[idx], name = rxn.id, vtype = GRB.CONTINUOUS)
+		if 'gurobi' not in compiled:
+			# create a gurobi model
+			gpModel = gp.Model()
+
+			# Set params
+			gpModel.Params.OutputFlag = 0
+			gpModel.Params.Presolve = 0
+			gpModel.Params.NumericFocus = 3
+			gpModel.Params.FeasibilityTol = 1e-9
+			gpModel.Params.IntFeasTol = 1e-9
+			gpModel.Params.OptimalityTol = 1e-9
+			gpModel.Params.Method = 0
+			gpModel.Params.BarQCPConvTol = 1.
+			#gpModel.Params.PivotTolG = 10.
+			#gpModel.Params.UpdateTol = 10.
+			#gpModel.Params.SingularTol = 1e-30
+			gpModel.Params.BarHomogeneous = 1.
+
+			# Define decision variables and objective function
+			obj = numpy.array([ 1. if rxn.objective_coefficient != 0 else 0. for rxn in self.reactions ])
+			x = gpModel.addMVar(len(lb), lb = lb, ub = ub, obj = obj, vtype = GRB.CONTINUOUS)
+			gpModel.ModelSense = GRB.MAXIMIZE
+
+			# Add constraints for system of linear equations
+			gpModel.addMConstr(Sp.tocsr(), x, GRB.EQUAL, b)
+			gpModel.update()
+
+			compiled['gurobi'] = (gpModel, gpModel.getVars(), gpModel.getConstrs())
+		else:
+			gpModel, variables, constraints = compiled['gurobi']
 
-		# Set objective function
-		lst = [ x[idx] for idx, rxn in enumerate(self.reactions) if rxn.objective_coefficient != 0 ]
-		gpModel.setObjective(gp.quicksum(lst), gp.GRB.MAXIMIZE)
+			gpModel.setAttr('LB', variables, lb.tolist())
+			gpModel.setAttr('UB', variables, ub.tolist())
+			gpModel.setAttr('RHS', constraints, b.tolist())
+			rows, cols, values = self._get_lp_coefficients(compiled, Sp)
+			for jdx, idx, value in zip(rows, cols, values):
+				gpModel.chgCoeff(constraints[jdx], variables[idx], value)
 
-		# Add constraints for system of linear equations
-		for jdx, met in enumerate(self.metabolites):
-			lhs = gp.LinExpr()
-			for idx, rxn in enumerate(self.reactions):
-				if (jdx, idx) in Sf: # Sf is a dictionary
-					lhs += Sf[(jdx, idx)] * x[idx]
-			gpModel.addConstr(lhs == 0)
+		gpModel.Params.Quad = 1 if precision == 'quad' else -1
 
 		# Optimize the model
 		gpModel.optimize()
 
 		# output solution
 		if gpModel.status == gp.GRB.OPTIMAL:
-			x_primal = gpModel.x[ 0:len(self.reactions) ]
-			x_dict = { rxn.id : gpModel.x[idx] for idx, rxn in enumerate(self.reactions) }
-			y_dict = { met.id : gpModel.pi[idx] for idx, met in enumerate(self.metabolites) }
-			z_dict = { rxn.id : gpModel.RC[idx] for idx, rxn in enumerate(self.reactions) }
+			gpModel, variables, constraints = compiled['gurobi']
+			x_dict = dict(zip(self.reactions.list_attr('id'), gpModel.getAttr('X', variables)))
+			y_dict = dict(zip(self.metabolites.list_attr('id'), gpModel.getAttr('Pi', constraints)))
+			z_dict = dict(zip(self.reactions.list_attr('id'), gpModel.getAttr('RC', variables)))
 
 			self.solution = cobra.core.Solution(
-				objective_value = list(keys.values())[0],
+				objective_value = muf,
+				status = 'optimal',
+				fluxes = x_dict,
+				reduced_costs = z_dict,
+				shadow_prices = y_dict,
+				)
+			return True
+		else:
+			if hasattr(self, 'solution'):
+				del self.solution
+			return False
+
+	@staticmethod
+	def _get_lp_coefficients(compiled, Sp):
+		# (rows, columns, values) of the growth rate-dependent coefficients in Sp
+		template = compiled['S']
+		if 'positions' not in compiled:
+			positions = numpy.unique(template.pos)
+			cols = numpy.repeat(numpy.arange(template.shape[1]), numpy.diff(template.indptr))
+			compiled['positions'] = (positions, template.indices[positions], cols[positions])
+		positions, rows, cols = compiled['positions']
+		return rows, cols, Sp.data[positions]
+
+	def feas_highs(self, keys = { sympy.Symbol('mu', positive = True) : 0.1 }, precision = None, **kwargs):
+		"""
+		Check the feasibility of the ME-model at a fixed growth rate using
+		HiGHS through scipy.optimize.linprog.
+
+		The stoichiometric matrix is passed in CSC form (see `to_sparse`), so
+		successive calls only evaluate the growth rate-dependent coefficients.
+		HiGHS solves in double precision and `precision` is ignored. Only the
+		bounds are read from the 'lp' keyword; the stoichiometry is always that
+		of the ME-model.
+		"""
+		# check options
+		for key in list(keys.keys()):
+			if isinstance(key, sympy.Symbol):
+				pass
+			else:
+				keys[sympy.Symbol(key, positive = True)] = keys.pop(key)
+
+		muf = float(list(keys.values())[0])
+
+		compiled, Sp, lb, ub, b = self._evaluate_lp(muf, kwargs.get('lp', None))
+
+		# maximize the flux of the objective reactions
+		c = [ -1. if rxn.objective_coefficient != 0 else 0. for rxn in self.reactions ]
+
+		import scipy.optimize
+		res = scipy.optimize.linprog(c, A_eq = Sp, b_eq = b, bounds = numpy.array([lb, ub]).T, method = 'highs')
+
+		# output solution
+		if res.status == 0:
+			x_dict = { rxn.id : res.x[idx] for idx, rxn in enumerate(self.reactions) }
+			# change signs of the marginals of the minimization problem
+			y_dict = { met.id : -res.eqlin.marginals[idx] for idx, met in enumerate(self.metabolites) }
+			z = -(res.lower.marginals + res.upper.marginals)
+			z_dict = { rxn.id : z[idx] for idx, rxn in enumerate(self.reactions) }
+
+			self.solution = cobra.core.Solution(
+				objective_value = muf,
 				status = 'optimal',
 				fluxes = x_dict,
 				reduced_costs = z_dict,
@@ -1560,6 +2539,13 @@ class MEModel(cobra.core.model.Model):
 		from coralme.solver.solver import ME_NLP
 		#me_nlp = ME_NLP(me)
 		me_nlp = ME_NLP(Sf, dict(), b, c, lb, ub, cs, set(keys.keys()), None)
+
+		if basis is None:
+			basis = self.get_basis(list(keys.values())[0])
+		elif basis is False:
+			# cold start, without the stored bases
+			basis = None
+
 		muopt, xopt, yopt, zopt, basis, stat = me_nlp.bisectmu(
 				mumax = 1., # mu was already replaced and maxIter is one, so a value here doesn't matter
 				mumin = 0.,
@@ -1588,6 +2574,7 @@ class MEModel(cobra.core.model.Model):
 				shadow_prices = y_dict,
 				)
 			self.basis = basis
+			self.store_basis(list(keys.values())[0], basis)
 			return True
 		else:
 			if hasattr(self, 'solution'):
@@ -1596,6 +2583,69 @@ class MEModel(cobra.core.model.Model):
 				self.basis = None
 			return False
 
+	def get_structure_hash(self):
+		"""
+		Return a hash of the ordered reaction and metabolite identifiers. A
+		basis of the LP problem is only valid for ME-models with the same hash.
+
+		The hash is kept until reactions or metabolites are added, removed or
+		renamed (see `_mark_lp_dirty`).
+		"""
+		size = (len(self.reactions), len(self.metabolites))
+		cached = getattr(self, '_structure_hash', None)
+		if cached is not None and cached[0] == size:
+			return cached[1]
+
+		ids = self.reactions.list_attr('id') + [''] + self.metabolites.list_attr('id')
+		value = hashlib.md5('\n'.join(ids).encode('utf-8')).hexdigest()
+		if isinstance(self, MEModel):
+			# M-models do not flag structural changes
+			self._structure_hash = (size, value)
+		return value
+
+	def store_basis(self, mu, basis, max_structures = 10):
+		"""
+		Save a copy of a qMINOS basis obtained at growth rate `mu` for warm-start.
+		Bases are keyed by the hash of the ME-model structure and the growth rate.
+		"""
+		if basis is None:
+			return None
+		if not hasattr(self, '_basis_store'):
+			self._basis_store = collections.OrderedDict()
+
+		key = self.get_structure_hash()
+		self._basis_store.setdefault(key, {})[float(mu)] = numpy.array(basis, copy = True)
+		self._basis_store.move_to_end(key)
+
+		# keep bases only for the most recent structures
+		while len(self._basis_store) > max_structures:
+			self._basis_store.popitem(last = False)
+		return None
+
+	def get_basis(self, mu = None):
+		"""
+		Return a copy of the stored basis with the nearest growth rate to `mu`
+		(or the most recently stored if `mu` is None) for the current ME-model
+		structure. Returns None if there is no basis to warm-start from.
+		"""
+		if not hasattr(self, '_basis_store'):
+			return None
+
+		bases = self._basis_store.get(self.get_structure_hash(), {})
+		if len(bases) == 0:
+			return None
+
+		if mu is None:
+			key = list(bases.keys())[-1]
+		else:
+			key = min(bases.keys(), key = lambda x: abs(x - float(mu)))
+		return bases[key].copy()
+
+	def clear_basis(self):
+		"""Remove all stored bases."""
+		self._basis_store = collections.OrderedDict()
+		self.basis = None
+
 	def map_feasibility(self, keys = { sympy.Symbol('mu', positive = True) : 1. }, tolerance = 1e-6, precision = 'quad'):
 		return NotImplemented
 
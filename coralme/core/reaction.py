@@ -27,6 +27,7 @@ import coralme
 from coralme.core.component import Metabolite as Metabolite
 
 from collections import defaultdict, Counter
+from functools import partial
 from operator import attrgetter
 import re
 
@@ -81,6 +82,10 @@ class MEReaction(cobra.core.reaction.Reaction):
 		class
 
 	"""
+	# global_info keys and process data read by update(), see MEModel.get_dependency_graph
+	_global_info_keys = frozenset()
+	_process_data_ids = frozenset()
+
 	def __init__(self, id = None, name = ''):
 		cobra.core.reaction.Reaction.__init__(self, id, name)
 		self._objective_coefficient = 0.
@@ -103,6 +108,20 @@ class MEReaction(cobra.core.reaction.Reaction):
 	@objective_coefficient.setter
 	def objective_coefficient(self, value):
 		self._objective_coefficient = value
+		self._mark_lp_dirty()
+
+	def _mark_lp_dirty(self):
+		# flag the column of the reaction in the LP problem of the ME-model
+		model = getattr(self, '_model', None)
+		if model is not None and hasattr(model, '_mark_lp_dirty'):
+			model._mark_lp_dirty([ self ])
+
+	def _intern(self, value):
+		# shared copy of a coefficient or bound, see `MEModel.coefficients`
+		model = getattr(self, '_model', None)
+		if model is not None and hasattr(model, '_intern'):
+			return model._intern(value)
+		return value
 
 	def check_me_mass_balance(self):
 		"""
@@ -283,6 +302,8 @@ class MEReaction(cobra.core.reaction.Reaction):
 		#reverse_variable = self.reverse_variable
 		self._id = value
 		self.model.reactions._generate_index()
+		if hasattr(self.model, '_mark_lp_dirty'):
+			self.model._mark_lp_dirty()
 		#forward_variable.name = self.id
 		#reverse_variable.name = self.reverse_id
 
@@ -322,6 +343,59 @@ class MEReaction(cobra.core.reaction.Reaction):
 
 		self.remove_from_model(remove_orphans=remove_orphans)
 
+	def __imul__(self, coefficient: float) -> "MEReaction":
+		"""Scale coefficients in a reaction by a given value in place.
+
+		E.g. A -> B becomes 2A -> 2B.
+
+		If coefficient is less than zero, the reaction is reversed and the
+		bounds are swapped.
+
+		This method was modified from the original cobrapy to not populate
+		the solver interface, and to flag the column of the reaction in the
+		LP problem of the ME-model.
+
+		Parameters
+		----------
+		coefficient: float
+			Value to scale coefficients of metabolites by. If less than zero, reverses
+			the reaction.
+
+		Returns
+		-------
+		MEReaction
+			Returns the same reaction modified in place.
+		"""
+		self._metabolites = {
+			met: self._intern(value * coefficient) for met, value in self._metabolites.items()
+		}
+
+		if coefficient < 0:
+			self.bounds = (-self.upper_bound, -self.lower_bound)
+
+		context = get_context(self)
+		if context:
+			context(partial(self.__imul__, 1.0 / coefficient))
+
+		self._mark_lp_dirty()
+		return self
+
+	def __iadd__(self, other: "MEReaction") -> "MEReaction":
+		"""Add two reactions in place and return the modified first one.
+		See `cobra.core.reaction.Reaction.__iadd__`.
+		"""
+		cobra.core.reaction.Reaction.__iadd__(self, other)
+		self._mark_lp_dirty()
+		return self
+
+	def __isub__(self, other: "MEReaction") -> "MEReaction":
+		"""Subtract metabolites of one reaction from another in place.
+		See `cobra.core.reaction.Reaction.__isub__`.
+		"""
+		cobra.core.reaction.Reaction.__isub__(self, other)
+		self._mark_lp_dirty()
+		return self
+
 	def add_metabolites(
 		self,
 		metabolites_to_add: Dict[Metabolite, float],
@@ -363,6 +437,7 @@ class MEReaction(cobra.core.reaction.Reaction):
 		"""
 		old_coefficients = self.metabolites
 		new_metabolites = []
+		changed = []
 		_id_to_metabolites = dict([(x.id, x) for x in self._metabolites])
 
 		for metabolite, coefficient in metabolites_to_add.items():
@@ -383,6 +458,7 @@ class MEReaction(cobra.core.reaction.Reaction):
 					self._metabolites[reaction_metabolite] += coefficient
 				else:
 					self._metabolites[reaction_metabolite] = coefficient
+				changed.append(reaction_metabolite)
 			else:
 				# If the reaction is in a model, ensure we aren't using
 				# a duplicate metabolite.
@@ -403,6 +479,7 @@ class MEReaction(cobra.core.reaction.Reaction):
 						f"instead of strings as keys."
 					)
 				self._metabolites[metabolite] = coefficient
+				changed.append(metabolite)
 				# make the metabolite aware that it is involved in this
 				# reaction
 				metabolite._reaction.add(self)
@@ -412,12 +489,20 @@ class MEReaction(cobra.core.reaction.Reaction):
 		if model is not None:
 			model.add_metabolites(new_metabolites)
 
-		for metabolite, the_coefficient in list(self._metabolites.items()):
+		# only the coefficients set by this call are checked and interned
+		for metabolite in changed:
+			if metabolite not in self._metabolites:
+				continue
+			the_coefficient = self._metabolites[metabolite]
 			if the_coefficient == 0:
 				# make the metabolite aware that it no longer participates
 				# in this reaction
 				metabolite._reaction.remove(self)
 				self._metabolites.pop(metabolite)
+			elif hasattr(the_coefficient, 'free_symbols'):
+				self._metabolites[metabolite] = self._intern(the_coefficient)
+
+		self._mark_lp_dirty()
 
 	def _check_bounds(self, lb, ub):
 		#logging.warning('New cobraME \'_check_bounds\' method supersedes \'_check_bounds\' from cobrapy')
@@ -598,7 +683,8 @@ class MEReaction(cobra.core.reaction.Reaction):
 		"""
 		# Validate bounds before setting them.
 		self._check_bounds(value, self._upper_bound)
-		self._lower_bound = value
+		self._lower_bound = self._intern(value)
+		self._mark_lp_dirty()
 		#self.update_variable_bounds()
 
 	@property
@@ -639,7 +725,8 @@ class MEReaction(cobra.core.reaction.Reaction):
 		"""
 		# Validate bounds before setting them.
 		self._check_bounds(self._lower_bound, value)
-		self._upper_bound = value
+		self._upper_bound = self._intern(value)
+		self._mark_lp_dirty()
 		#self.update_variable_bounds()
 
 	@property
@@ -675,8 +762,9 @@ class MEReaction(cobra.core.reaction.Reaction):
 		lower, upper = value
 		# Validate bounds before setting them.
 		self._check_bounds(lower, upper)
-		self._lower_bound = lower
-		self._upper_bound = upper
+		self._lower_bound = self._intern(lower)
+		self._upper_bound = self._intern(upper)
+		self._mark_lp_dirty()
 		#self.update_variable_bounds()
 
 	@property
@@ -1117,6 +1205,8 @@ class PostTranslationReaction(MEReaction):
 		Identifier of the post translation reaction
 
 	"""
+	_global_info_keys = frozenset([ 'temperature' ])
+
 	def __init__(self, id = None):
 		MEReaction.__init__(self, id)
 		self._posttranslation_data = None
@@ -1331,6 +1421,10 @@ class TranscriptionReaction(MEReaction):
 
 	"""
 
+	# update() also modifies the demand reactions of the transcripts, see MEModel._parallel_update
+	_local_update = False
+	_global_info_keys = frozenset([ 'kt', 'r0', 'm_rr', 'f_rRNA', 'm_aa' ])
+
 	# TODO double check how initiation is used as well as ATP cost etc.
 	def __init__(self, id = None):
 		MEReaction.__init__(self, id)
@@ -1585,6 +1679,11 @@ class TranslationReaction(MEReaction):
 		should be prefixed with 'translation + _'
 
 	"""
+	_global_info_keys = frozenset([
+		'domain', 'kt', 'k_deg', 'r0', 'm_rr', 'f_rRNA', 'm_aa', 'm_nt', 'f_mRNA',
+		'ribosome_id', 'degradosome_id', 'trna_misacylation'
+		])
+	_process_data_ids = frozenset([ 'atp_hydrolysis' ])
 
 	def __init__(self, id = None):
 		MEReaction.__init__(self, id)
@@ -1887,6 +1986,8 @@ class tRNAChargingReaction(MEReaction):
 		If tRNA initiates translation, <codon> should be replaced with START.
 
 	"""
+	_global_info_keys = frozenset([ 'm_tRNA', 'm_aa', 'f_tRNA', 'kt', 'r0' ])
+
 	def __init__(self, id = None):
 		MEReaction.__init__(self, id)
 		self._tRNA_data = None
@@ -1997,6 +2098,8 @@ class SummaryVariable(MEReaction):
 		Identifier of the SummaryVariable
 
 	"""
+	_global_info_keys = frozenset([ 'dnapol_id' ])
+
 	def __init__(self, id = None):
 		MEReaction.__init__(self, id)
 		self._objective_coefficient = 0.
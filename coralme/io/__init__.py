@@ -4,3 +4,4 @@ __version__ = "1.0"
 import coralme.io.json
 import coralme.io.dict
 import coralme.io.pickle
+import coralme.io.npz
@@ -1,6 +1,10 @@
 import tqdm
 bar_format = '{desc:<75}: {percentage:.1f}%|{bar}| {n_fmt:>5}/{total_fmt:>5} [{elapsed}<{remaining}]'
 
+import random
+import functools
+import collections
+
 import sympy
 import coralme
 
@@ -146,6 +150,99 @@ _METABOLITE_TYPE_DEPENDENCIES = {
 		]
 	}
 
+# Maximum number of entries of the expression caches, see `get_expression_cache_info`
+_EXPRESSION_CACHE_SIZE = 2**16
+
+_CacheInfo = collections.namedtuple('CacheInfo', [ 'hits', 'misses', 'maxsize', 'currsize' ])
+
+class _LRUCache(object):
+	"""
+	Bounded LRU cache of the results of fn, with the statistics of
+	functools.lru_cache. Unlike functools.lru_cache, results computed
+	elsewhere (e.g., in worker processes) can be added to it.
+	"""
+	def __init__(self, fn, maxsize):
+		self.fn = fn
+		self.maxsize = maxsize
+		self.cache_clear()
+
+	def __contains__(self, key):
+		return key in self.data
+
+	def __call__(self, *key):
+		try:
+			value = self.data[key]
+		except KeyError:
+			self.misses += 1
+			value = self.fn(*key)
+			self.add(key, value)
+			return value
+		self.hits += 1
+		self.data.move_to_end(key)
+		return value
+
+	def add(self, key, value):
+		self.data[key] = value
+		self.data.move_to_end(key)
+		if len(self.data) > self.maxsize:
+			self.data.popitem(last = False)
+
+	def cache_info(self):
+		return _CacheInfo(self.hits, self.misses, self.maxsize, len(self.data))
+
+	def cache_clear(self):
+		self.data = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+def _sympify_expression(value, growth_key):
+	# The json file includes the 'mu' key in dct['global_info']['growth_key'] as a string
+	# We use dct['global_info']['growth_key'] to set a sympy.Symbol called 'growth_key'
+	expression_value = sympy.sympify(value)
+	if isinstance(expression_value, (sympy.core.numbers.Float, sympy.core.numbers.One, sympy.core.numbers.NegativeOne, sympy.core.numbers.Integer)):
+		return float(expression_value)
+	else:
+		return expression_value.subs(str(growth_key), growth_key)
+
+_parse_expression = _LRUCache(_sympify_expression, _EXPRESSION_CACHE_SIZE)
+
+@functools.lru_cache(maxsize = _EXPRESSION_CACHE_SIZE)
+def _print_expression(value):
+	return str(value)
+
+def get_expression_cache_info():
+	"""
+	Return the statistics of the caches of expressions parsed on load
+	('parse', see `get_sympy_expression`) and printed on save ('print', see
+	`_fix_type`).
+
+	Returns
+	-------
+	dict
+		{ cache : { 'hits', 'misses', 'hit_rate', 'size', 'maxsize' } }
+
+	"""
+	info = {}
+	for key, fn in [ ('parse', _parse_expression), ('print', _print_expression) ]:
+		stats = fn.cache_info()
+		calls = stats.hits + stats.misses
+		info[key] = {
+			'hits' : stats.hits,
+			'misses' : stats.misses,
+			'hit_rate' : stats.hits / calls if calls else 0.,
+			'size' : stats.currsize,
+			'maxsize' : stats.maxsize,
+			}
+	return info
+
+def clear_expression_cache():
+	"""
+	Empty the caches of parsed and printed expressions and reset their
+	statistics.
+	"""
+	_parse_expression.cache_clear()
+	_print_expression.cache_clear()
+
 def get_sympy_expression(value, growth_key):
 	"""
 	Return sympy expression from json string using sympify
@@ -154,6 +251,9 @@ def get_sympy_expression(value, growth_key):
 	assumption. The mu symbol produced from sympify is replaced with
 	coralme's mu value to ensure the expression can be used in the model.
 
+	Strings repeat across reactions, and their expressions are kept in a
+	bounded LRU cache (see `get_expression_cache_info`).
+
 	Parameters
 	----------
 	value : str
@@ -165,13 +265,46 @@ def get_sympy_expression(value, growth_key):
 		Numeric representation of string with coralme's mu symbol substituted
 
 	"""
-	# The json file includes the 'mu' key in dct['global_info']['growth_key'] as a string
-	# We use dct['global_info']['growth_key'] to set a sympy.Symbol called 'growth_key'
-	expression_value = sympy.sympify(value)
-	if isinstance(expression_value, (sympy.core.numbers.Float, sympy.core.numbers.One, sympy.core.numbers.NegativeOne, sympy.core.numbers.Integer)):
-		return float(expression_value)
+	if isinstance(value, (int, float)) and not isinstance(value, bool):
+		return float(value)
+	return _parse_expression(value, growth_key)
+
+# growth rate symbol of the expression workers, see `get_sympy_expressions`
+_growth_key = None
+
+def _init_expression_worker(growth_key):
+	global _growth_key
+	_growth_key = growth_key
+
+def _expression_worker(value):
+	return get_sympy_expression(value, _growth_key)
+
+def get_sympy_expressions(values, growth_key, pool = None):
+	"""
+	Parse the strings in values that are not in the cache of expressions
+	(see `get_sympy_expression`) and add them to it. The expressions are
+	then returned from the cache by `get_sympy_expression`.
+
+	Parameters
+	----------
+	values : iterable
+		Strings (and numbers, which are skipped)
+	growth_key : sympy.Symbol
+		coralme's mu symbol
+	pool : multiprocessing.Pool, optional
+		Pool initialized with `_init_expression_worker`, which converts the
+		new strings
+
+	"""
+	new = list(set([ value for value in values if isinstance(value, str) and (value, growth_key) not in _parse_expression ]))
+
+	if pool is not None and len(new) > 1:
+		for value, expression in zip(new, pool.map(_expression_worker, new)):
+			_parse_expression.misses += 1
+			_parse_expression.add((value, growth_key), expression)
 	else:
-		return expression_value.subs(str(growth_key), growth_key)
+		for value in new:
+			get_sympy_expression(value, growth_key)
 
 def get_numeric_from_string(string):
 	"""
@@ -204,7 +337,7 @@ def _fix_type(value):
 	if isinstance(value, set):
 		return list(value)
 	if isinstance(value, sympy.Basic):
-		return str(value)
+		return _print_expression(value)
 	if hasattr(value, 'id'):
 		return str(value.id)
 	# if value is None:
@@ -427,12 +560,19 @@ def _add_process_data_from_dict(model, process_data_dict):
 			# set to the hidden attribute instead
 			setattr(process_data, '_' + attribute, value)
 
-def _add_reaction_from_dict(model, reaction_info):
+def _add_reaction_from_dict(model, reaction_info, update = True):
 	"""
 	Builds reaction instances defined in dictionary, then add it to the
 	ME-model being constructed.
 
+	If update is False, the stoichiometry of the reaction is set from the
+	dictionary instead of updating the reaction.
+
 	"""
+	growth_key = model.global_info['growth_key']
+	def get_expression(value):
+		return get_sympy_expression(value, growth_key)
+
 	reaction_type_dict = reaction_info['reaction_type']
 
 	if len(reaction_type_dict) == 1:
@@ -450,7 +590,7 @@ def _add_reaction_from_dict(model, reaction_info):
 		# upper and lower bounds may contain mu values. Handle that here
 		value = reaction_info[attribute]
 		if attribute in ['upper_bound', 'lower_bound']:
-			value = get_sympy_expression(value, model.global_info['growth_key'])
+			value = get_expression(value)
 		setattr(reaction_obj, attribute, value)
 
 	# Some reactions are added to model when ME-models are initialized
@@ -463,9 +603,9 @@ def _add_reaction_from_dict(model, reaction_info):
 
 	# These reactions types do not have update functions and need their
 	# stoichiometries set explicitly .
-	if reaction_type in ['SummaryVariable', 'MEReaction']:
+	if update and reaction_type in ['SummaryVariable', 'MEReaction']:
 		for key, value in reaction_info['metabolites'].items():
-			reaction_obj.add_metabolites({model.metabolites.get_by_id(key): get_sympy_expression(value, model.global_info['growth_key'])}, combine=False)
+			reaction_obj.add_metabolites({model.metabolites.get_by_id(key): get_expression(value)}, combine=False)
 
 	for attribute in _REACTION_TYPE_DEPENDENCIES.get(reaction_type, []):
 		# Spontaneous reactions do no require complex_data
@@ -475,10 +615,147 @@ def _add_reaction_from_dict(model, reaction_info):
 		value = reaction_type_dict[reaction_type][attribute]
 		setattr(reaction_obj, attribute, value)
 
-	if hasattr(reaction_obj, 'update'):
+	if not update:
+		# reactions created with the ME-model or the process data
+		if reaction_obj._metabolites:
+			reaction_obj.clear_metabolites()
+		reaction_obj.add_metabolites({
+			model.metabolites.get_by_id(key):get_expression(value)
+			for key, value in reaction_info['metabolites'].items() }, combine = False)
+	elif hasattr(reaction_obj, 'update'):
 		reaction_obj.update()
 
-def me_model_from_dict(obj):
+def _check_me_model(model):
+	"""
+	Check that reactions and metabolites of a ME-model point to each other
+	and to objects in the ME-model, without updating reactions. Raise a
+	ValueError listing the inconsistencies.
+	"""
+	errors = []
+	for rxn in model.reactions:
+		if rxn._model is not model:
+			errors.append('Reaction \'{:s}\' does not point to the ME-model.'.format(rxn.id))
+		for met in rxn._metabolites:
+			if not model.metabolites.has_id(met.id) or model.metabolites.get_by_id(met.id) is not met:
+				errors.append('Metabolite \'{:s}\' of reaction \'{:s}\' is not in the ME-model.'.format(met.id, rxn.id))
+			elif rxn not in met._reaction:
+				errors.append('Metabolite \'{:s}\' is not aware of reaction \'{:s}\'.'.format(met.id, rxn.id))
+	for met in model.metabolites:
+		for rxn in met._reaction:
+			if met not in rxn._metabolites:
+				errors.append('Metabolite \'{:s}\' points to reaction \'{:s}\' without participating in it.'.format(met.id, rxn.id))
+
+	if errors:
+		raise ValueError('The ME-model is not consistent:\n' + '\n'.join(errors))
+
+def _get_updated_stoichiometry(model, rxn, formulas):
+	"""
+	Return the stoichiometry { metabolite ID : value } and bounds computed by
+	the update function of rxn, and undo the changes of the update in the
+	ME-model: the stoichiometry and bounds of rxn (and of the demand reactions
+	of transcripts, see `TranscriptionReaction.update`), the formulas of its
+	metabolites (restored from `formulas`), and the metabolites, reactions and
+	process data created by the update.
+	"""
+	touched = [ rxn ]
+	if isinstance(rxn, coralme.core.reaction.TranscriptionReaction):
+		for transcript_id in rxn.transcription_data.RNA_products:
+			if model.reactions.has_id('DM_' + transcript_id):
+				touched.append(model.reactions.get_by_id('DM_' + transcript_id))
+	saved = [ (x, dict(x._metabolites), x.bounds) for x in touched ]
+	sizes = (len(model.metabolites), len(model.reactions), len(model.process_data))
+
+	metabolites = list(rxn._metabolites.keys())
+	try:
+		rxn.update(verbose = False)
+		metabolites += list(rxn._metabolites.keys())
+		return { met.id:value for met, value in rxn._metabolites.items() }, rxn.bounds
+	finally:
+		# equal values can differ in type (e.g., 1 and 1.0), so they are always restored
+		for x, stoichiometry, bounds in saved:
+			x.clear_metabolites()
+			x.add_metabolites(stoichiometry, combine = False)
+			x.bounds = bounds
+		for met in metabolites:
+			if met.id in formulas and met.formula != formulas[met.id]:
+				met.formula = formulas[met.id]
+
+		# created by the update
+		if len(model.reactions) > sizes[1]:
+			model.remove_reactions(list(model.reactions[sizes[1]:]))
+		if len(model.metabolites) > sizes[0]:
+			model.remove_metabolites(list(model.metabolites[sizes[0]:]))
+		for data in list(model.process_data[sizes[2]:]):
+			model.process_data.remove(data)
+
+def check_stoichiometry(model, reactions = None, sample = None, seed = None, growth_rates = (0.1, 1.), rtol = 1e-6):
+	"""
+	Compare the stoichiometry and bounds of reactions with the ones computed
+	by their update function, e.g., after loading a ME-model with
+	`me_model_from_dict(obj, trusted = True)`. Each reaction is updated and
+	its changes to the ME-model are undone, so the ME-model is not modified,
+	and values are compared at the given growth rates.
+
+	Parameters
+	----------
+	model : :class:`~coralme.core.model.MEModel`
+	reactions : list, optional
+		Reactions or reaction identifiers to check. Defaults to all reactions
+		with an update function
+	sample : int, optional
+		Number of reactions to check, chosen at random
+	seed : int, optional
+		Seed of the random sample
+	growth_rates : tuple
+		Values of mu to evaluate the coefficients
+	rtol : float
+		Relative tolerance of the comparison
+
+	Returns
+	-------
+	dict
+		{ reaction ID : { metabolite ID, 'lower_bound' or 'upper_bound' :
+		(stored value, updated value) } } of the reactions that differ
+
+	"""
+	if reactions is None:
+		reactions = [ rxn for rxn in model.reactions if hasattr(rxn, 'update') ]
+	else:
+		reactions = [ model.reactions.get_by_id(rxn) if isinstance(rxn, str) else rxn for rxn in reactions ]
+	if sample is not None and sample < len(reactions):
+		reactions = random.Random(seed).sample(reactions, sample)
+
+	def evaluate(value):
+		if hasattr(value, 'subs'):
+			return [ float(value.subs(model.mu, mu)) for mu in growth_rates ]
+		return [ float(value) ] * len(growth_rates)
+
+	def differ(x, y):
+		return any([ abs(a - b) > rtol * max(abs(a), abs(b)) for a, b in zip(evaluate(x), evaluate(y)) ])
+
+	# updates set the formulas of products, and they are restored after each update
+	formulas = { met.id:met.formula for met in model.metabolites }
+
+	differences = {}
+	for rxn in reactions:
+		updated, bounds = _get_updated_stoichiometry(model, rxn, formulas)
+
+		diff = {}
+		for met, value in rxn._metabolites.items():
+			new = updated.pop(met.id, 0.)
+			if differ(value, new):
+				diff[met.id] = (value, new)
+		for met_id, value in updated.items():
+			diff[met_id] = (0., value)
+		for key, old, new in zip([ 'lower_bound', 'upper_bound' ], rxn.bounds, bounds):
+			if differ(old, new):
+				diff[key] = (old, new)
+		if diff:
+			differences[rxn.id] = diff
+
+	return differences
+
+def me_model_from_dict(obj, trusted = False):
 	"""
 	Load ME-model from its dictionary representation. This will return
 	a full :class:`~coralme.core.model.MEModel` object identical to the
@@ -488,6 +765,10 @@ def me_model_from_dict(obj):
 	----------
 	obj : dict
 		Dictionary representation of ME-model
+	trusted : bool
+		If True, the stoichiometry of reactions is restored from the
+		dictionary and reactions are not updated. The ME-model can be
+		compared with its process data later, see `check_stoichiometry`
 
 	Returns
 	-------
@@ -510,9 +791,12 @@ def me_model_from_dict(obj):
 		_add_process_data_from_dict(model, process_data)
 
 	for reaction in tqdm.tqdm(obj['reactions'], 'Adding Reactions into the ME-model...', bar_format = bar_format):
-		_add_reaction_from_dict(model, reaction)
+		_add_reaction_from_dict(model, reaction, update = not trusted)
 
 	coralme.builder.compartments.add_compartments_to_model(model)
-	model.update()
+	if trusted:
+		_check_me_model(model)
+	else:
+		model.update()
 
 	return model
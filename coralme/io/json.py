@@ -38,12 +38,85 @@ def get_schema():
 	with open(os.path.join(cur_dir, 'JSONSCHEMA'), 'r') as f:
 		return json.load(f)
 
+def _get_validators():
+	"""
+	Return a dictionary of { top-level key : validator } of the elements of
+	the ME-model JSON. Lists (e.g., reactions) are validated per element.
+	"""
+	schema = get_schema()
+	cls = jsonschema.validators.validator_for(schema)
+	validators = {}
+	for key, value in schema['properties'].items():
+		if 'items' in value:
+			validators[key] = cls(value['items'])
+		else:
+			validators[key] = cls(value)
+	return validators
+
+def _dump(obj, depth, sort, default):
+	# same layout as json.dumps(..., indent = 2) of the obj nested at depth
+	return json.dumps(obj, indent = 2, sort_keys = sort, default = default).replace('\n', '\n' + '  ' * depth)
+
+def _write_me_model(model, outfile, sort = True):
+	"""
+	Write the JSON representation of the ME-model (see
+	`coralme.io.dict.me_model_to_dict`) to an open text file, element by
+	element. Each element is validated against the JSONSCHEMA before being
+	written.
+	"""
+	def set_default(obj):
+		if isinstance(obj, set):
+			return list(obj)
+		if isinstance(obj, pandas.DataFrame):
+			return obj.to_dict()
+		#raise TypeError
+
+	validators = _get_validators()
+
+	def validate(key, obj):
+		try:
+			validators[key].validate(obj)
+		except jsonschema.ValidationError:
+			raise Exception('Must pass valid ME-model json file')
+
+	# same keys and order as `coralme.io.dict.me_model_to_dict`
+	elements = OrderedDict([
+		('reactions', (model.reactions, coralme.io.dict._reaction_to_dict)),
+		('process_data', (model.process_data, coralme.io.dict._process_data_to_dict)),
+		('metabolites', (model.metabolites, coralme.io.dict._metabolite_to_dict)),
+		('global_info', None),
+		])
+
+	outfile.write('{')
+	for idx, key in enumerate(sorted(elements.keys()) if sort else elements.keys()):
+		outfile.write('{:s}\n  {:s}: '.format(',' if idx else '', json.dumps(key)))
+		if key == 'global_info':
+			global_info = coralme.io.dict._get_global_info_dict(model.global_info)
+			validate(key, global_info)
+			outfile.write(_dump(global_info, 1, sort, set_default))
+			continue
+
+		dictlist, to_dict = elements[key]
+		if len(dictlist) == 0:
+			outfile.write('[]')
+			continue
+		for jdx, obj in enumerate(dictlist):
+			obj = to_dict(obj)
+			validate(key, obj)
+			outfile.write('{:s}\n    '.format(',' if jdx else '[') + _dump(obj, 2, sort, set_default))
+		outfile.write('\n  ]')
+	outfile.write('\n}')
+
 def save_json_me_model(model, file_name, sort = True, compress = False):
 	"""
 	Save a full JSON version of the ME-model. Saving/loading a model in this
 	format can then be loaded to return a ME-model identical to the one saved,
 	which retains all ME-model functionality.
 
+	The JSON is written incrementally, and metabolites, process data and
+	reactions are validated one at a time. Memory use does not depend on the
+	size of the ME-model.
+
 	Parameters
 	----------
 
@@ -55,11 +128,6 @@ def save_json_me_model(model, file_name, sort = True, compress = False):
 
 	"""
 
-	#should_close = False
-	#if isinstance(file_name, str):
-		#file_name = open(file_name, 'w')
-		#should_close = True
-
 	# set logger
 	log = logging.getLogger() # root logger
 	for hdlr in log.handlers[:]: # remove all old handlers
@@ -70,47 +138,259 @@ def save_json_me_model(model, file_name, sort = True, compress = False):
 	#log.addHandler(logging.StreamHandler(sys.stdout))
 	logging.captureWarnings(True)
 
-	model_dict = coralme.io.dict.me_model_to_dict(model)
+	if hasattr(file_name, 'write'):
+		_write_me_model(model, file_name, sort = sort)
+	elif compress:
+		import gzip
+		with gzip.open(file_name + '.gz', 'wt', encoding = 'utf-8') as outfile:
+			_write_me_model(model, outfile, sort = sort)
+	else:
+		with open(file_name, 'w') as outfile:
+			_write_me_model(model, outfile, sort = sort)
 
 	logging.shutdown()
 
-	# Confirm that dictionary representation of model adheres to JSONSCHEMA
-	try:
-		jsonschema.validate(model_dict, get_schema())
-	except jsonschema.ValidationError:
-		raise Exception('Must pass valid ME-model json file')
-
-	#json.dump(model_dict, file_name)
+class _JSONStream(object):
+	"""
+	Incremental reader of a JSON document. The file is read in chunks and
+	only the element being decoded is kept in memory.
+	"""
+	def __init__(self, infile, chunk_size = 2**20):
+		self.infile = infile
+		self.chunk_size = chunk_size
+		self.buffer = ''
+		self.pos = 0
+		self.eof = False
+		self.decoder = json.JSONDecoder()
+
+	def _read(self):
+		# append the next chunk, discarding what was already decoded
+		chunk = self.infile.read(self.chunk_size)
+		if isinstance(chunk, bytes):
+			chunk = chunk.decode('utf-8')
+		self.eof = not chunk
+		self.buffer = self.buffer[self.pos:] + chunk
+		self.pos = 0
+		return not self.eof
+
+	def peek(self):
+		# next non-whitespace character, or '' at the end of the document
+		while True:
+			while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+				self.pos += 1
+			if self.pos < len(self.buffer):
+				return self.buffer[self.pos]
+			if not self._read():
+				return ''
+
+	def expect(self, chars):
+		char = self.peek()
+		if char == '' or char not in chars:
+			raise json.JSONDecodeError('Expecting one of \'{:s}\''.format(chars), self.buffer, self.pos)
+		self.pos += 1
+		return char
+
+	def value(self):
+		self.peek()
+		while True:
+			try:
+				obj, end = self.decoder.raw_decode(self.buffer, self.pos)
+			except json.JSONDecodeError:
+				# the element continues in the next chunk
+				if not self._read():
+					raise
+				continue
+			# numbers can also continue in the next chunk
+			if end == len(self.buffer) and not self.eof and self._read():
+				continue
+			self.pos = end
+			return obj
+
+	def _array(self):
+		if self.peek() == ']':
+			self.pos += 1
+			return
+		while True:
+			yield self.value()
+			if self.expect(',]') == ']':
+				return
+
+	def items(self):
+		"""
+		Yield the (key, value) pairs of the top-level object. Arrays are
+		yielded as iterators of their elements, which must be consumed
+		before the next pair. Incomplete documents and data after the
+		top-level object raise a JSONDecodeError.
+		"""
+		self.expect('{')
+		if self.peek() == '}':
+			self.pos += 1
+			if self.peek() != '':
+				raise json.JSONDecodeError('Extra data', self.buffer, self.pos)
+			return
+		while True:
+			key = self.value()
+			self.expect(':')
+			if self.peek() == '[':
+				self.pos += 1
+				elements = self._array()
+				yield key, elements
+				for element in elements:
+					pass
+			else:
+				yield key, self.value()
+			if self.expect(',}') == '}':
+				if self.peek() != '':
+					raise json.JSONDecodeError('Extra data', self.buffer, self.pos)
+				return
 
-	#if should_close:
-		#file_name.close()
+def _read_me_model(infile, processes = 1, trusted = True, batch_size = 10000):
+	"""
+	Build a ME-model from an open JSON file, element by element. Elements
+	are validated against the JSONSCHEMA as they are read. Expression strings
+	of reactions are converted once, in a pool of workers if processes > 1.
+	The stoichiometry of reactions is read from the file; if trusted is
+	False, the ME-model is updated afterwards.
+	"""
+	validators = _get_validators()
+
+	def validate(key, obj):
+		try:
+			validators[key].validate(obj)
+		except jsonschema.ValidationError:
+			raise Exception('Must pass valid ME-model json file')
+
+	model = None
+	attributes = {}
+	pool = None
+
+	def add_reactions(reactions):
+		nonlocal pool
+		if pool is None and processes > 1 and sys.platform != 'win32':
+			initargs = (model.global_info['growth_key'],)
+			from coralme.solver.solver import _get_pool
+			pool = _get_pool(processes, coralme.io.dict._init_expression_worker, initargs)
+
+		values = []
+		for reaction in reactions:
+			values.extend([ reaction['lower_bound'], reaction['upper_bound'] ])
+			values.extend(reaction['metabolites'].values())
+		coralme.io.dict.get_sympy_expressions(values, model.global_info['growth_key'], pool = pool)
+		for reaction in reactions:
+			coralme.io.dict._add_reaction_from_dict(model, reaction, update = False)
+
+	def add(key, elements):
+		if key == 'metabolites':
+			for metabolite in elements:
+				validate(key, metabolite)
+				coralme.io.dict._add_metabolite_from_dict(model, metabolite)
+		elif key == 'process_data':
+			for process_data in elements:
+				validate(key, process_data)
+				coralme.io.dict._add_process_data_from_dict(model, process_data)
+		elif key == 'reactions':
+			batch = []
+			for reaction in elements:
+				validate(key, reaction)
+				batch.append(reaction)
+				if len(batch) == batch_size:
+					add_reactions(batch)
+					batch = []
+			add_reactions(batch)
+
+	# elements are built in this order; elements read before the ones they
+	# depend on are kept until these are built
+	order = [ 'global_info', 'metabolites', 'process_data', 'reactions' ]
+	pending = {}
+	built = set()
+
+	def ready(key):
+		return all([ x in built for x in order[:order.index(key)] ])
+
+	def build(key, value):
+		nonlocal model
+		if key == 'global_info':
+			validate(key, value)
+			model = coralme.core.model.MEModel(mu = value['growth_key'])
+			model.global_info = value
+			model.global_info['growth_key'] = sympy.Symbol(model.global_info['growth_key'], positive = True)
+			for k, v in attributes.items():
+				setattr(model, k, v)
+		else:
+			add(key, value)
+		built.add(key)
+
+	read = set()
+	try:
+		for key, value in _JSONStream(infile).items():
+			read.add(key)
+			if key not in order:
+				if key in validators:
+					validate(key, value)
+				if key in { 'id', 'name' }:
+					attributes[key] = value
+					if model is not None:
+						setattr(model, key, value)
+				continue
 
-	def set_default(obj):
-		if isinstance(obj, set):
-			return list(obj)
-		if isinstance(obj, pandas.DataFrame):
-			return obj.to_dict()
-		#raise TypeError
+			if ready(key):
+				build(key, value)
+			else:
+				pending[key] = list(value)
+
+			for other in order:
+				if other in pending and ready(other):
+					build(other, pending.pop(other))
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+
+	# a truncated or partial file can be a valid document without some elements
+	missing = [ key for key in order if key not in read ]
+	if missing:
+		raise Exception('Must pass valid ME-model json file (missing {:s})'.format(', '.join(missing)))
+
+	coralme.builder.compartments.add_compartments_to_model(model)
+	if not trusted:
+		model.update(processes = processes)
+	coralme.io.dict._check_me_model(model)
 
-	json_str = json.dumps(model_dict, indent = 2, sort_keys = sort, default = set_default)
-	if compress:
-		import gzip
-		with gzip.open(file_name + '.gz', 'w') as outfile:
-			outfile.write(json_str.encode('utf-8'))
-	else:
-		with open(file_name, 'w') as outfile:
-			outfile.write(json_str)
+	return model
 
-def load_json_me_model(file_name):
+def load_json_me_model(file_name, processes = None, trusted = True):
 	"""
 	Load a full JSON version of the ME-model. Loading a model in this format
 	will return a ME-model identical to the one saved, which retains all
 	ME-model functionality.
 
+	The file is read element by element. The stoichiometry of reactions is
+	read from the file instead of updating reactions, and the ME-model is
+	checked for consistency at the end. Use
+	`coralme.io.dict.check_stoichiometry` to compare the stoichiometry with
+	the process data on demand.
+
+	Elements are built in the order global_info, metabolites, process_data
+	and reactions, the order of files saved with `save_json_me_model(sort =
+	True)`. Elements read before the ones they depend on are kept in memory
+	until these are built. Files saved with sort = False (or written in
+	another key order) start with the reactions and end with global_info,
+	so the whole file is kept in memory before the ME-model is built, and
+	loading them uses as much memory as `json.load`.
+
 	Parameters
 	----------
 	file_name : str or file-like object
-		Filename of the JSON output or an open json file
+		Filename of the JSON output (or gzipped JSON output, ending in .gz)
+		or an open json file
+
+	processes : int, optional
+		Number of worker processes converting expression strings (and
+		updating reactions). If None or 1, strings are converted serially.
+
+	trusted : bool
+		If False, the ME-model is updated after loading (see
+		`coralme.core.model.MEModel.update`)
 
 	Returns
 	-------
@@ -129,18 +409,17 @@ def load_json_me_model(file_name):
 	#log.addHandler(logging.StreamHandler(sys.stdout))
 	logging.captureWarnings(True)
 
-	if isinstance(file_name, str):
-		with open(file_name, 'r') as f:
-			model_dict = json.load(f)
-	else:
-		model_dict = json.load(file_name)
-
-	try:
-		jsonschema.validate(model_dict, get_schema())
-	except jsonschema.ValidationError:
-		raise Exception('Must pass valid ME-model json file')
+	processes = int(processes) if processes is not None and int(processes) > 1 else 1
 
-	model = coralme.io.dict.me_model_from_dict(model_dict)
+	if not isinstance(file_name, str):
+		model = _read_me_model(file_name, processes = processes, trusted = trusted)
+	elif file_name.endswith('.gz'):
+		import gzip
+		with gzip.open(file_name, 'rt', encoding = 'utf-8') as infile:
+			model = _read_me_model(infile, processes = processes, trusted = trusted)
+	else:
+		with open(file_name, 'r') as infile:
+			model = _read_me_model(infile, processes = processes, trusted = trusted)
 
 	logging.shutdown()
 
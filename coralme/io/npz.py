@@ -0,0 +1,322 @@
+"""
+Binary columnar format of ME-models, saved as a single NPZ archive.
+
+The stoichiometric matrix is stored in COO format ('S_row', 'S_col' and
+'S_const'), and the reaction bounds as arrays ('lb_const' and 'ub_const').
+Growth rate dependent values are stored as (entry, basis function, float
+multiplier) triplets ('S_term_*', 'lb_term_*' and 'ub_term_*') referencing
+a table of unique basis functions of mu ('basis', see
+`coralme.core.coefficient.CoefficientTable`). Reaction and metabolite
+identifiers and simple attributes are typed columns. Metabolites, process
+data, type-dependent attributes of reactions and global_info are UTF-8 JSON
+blobs, using the same records as `coralme.io.dict`.
+
+Members of uncompressed archives are memory-mapped on load and read in
+chunks. The ME-model is rebuilt from the stored stoichiometry, without
+parsing expressions of every coefficient or updating its reactions.
+Numbers are stored as floats, so integer and rational coefficients are
+loaded as floats (e.g., 5*mu is loaded as 5.0*mu), with the same values.
+"""
+
+import json
+import zipfile
+import collections
+
+import tqdm
+bar_format = '{desc:<75}: {percentage:.1f}%|{bar}| {n_fmt:>5}/{total_fmt:>5} [{elapsed}<{remaining}]'
+
+import numpy
+import pandas
+import sympy
+import coralme
+
+import logging
+log = logging.getLogger(__name__)
+
+_FORMAT = 'coralme-npz'
+_VERSION = 1
+# entries converted to Python values at once on load
+_CHUNK_SIZE = 65536
+
+def _to_blob(obj):
+	def set_default(obj):
+		if isinstance(obj, set):
+			return list(obj)
+		if isinstance(obj, pandas.DataFrame):
+			return obj.to_dict()
+		if isinstance(obj, sympy.Basic):
+			return str(obj)
+		raise TypeError('Object of type {:s} is not JSON serializable'.format(obj.__class__.__name__))
+	return numpy.frombuffer(json.dumps(obj, default = set_default).encode('utf-8'), dtype = numpy.uint8)
+
+def _from_blob(array):
+	return json.loads(numpy.asarray(array).tobytes().decode('utf-8'))
+
+def _split_values(values, split):
+	# constants and (entry, basis index, multiplier) triplets of the growth rate dependent values
+	const = numpy.zeros(len(values), dtype = float)
+	entry = []
+	basis = []
+	mult = []
+	for idx, value in enumerate(values):
+		const[idx], terms = split(value)
+		for bidx, coeff in terms.items():
+			entry.append(idx)
+			basis.append(bidx)
+			mult.append(coeff)
+
+	return {
+		'const' : const,
+		'term_entry' : numpy.array(entry, dtype = numpy.int64),
+		'term_basis' : numpy.array(basis, dtype = numpy.int32),
+		'term_mult' : numpy.array(mult, dtype = float),
+		}
+
+def _iter_rows(*columns):
+	# rows of columns of equal length, converted to Python values in chunks,
+	# so that memory-mapped members are not read at once
+	for start in range(0, len(columns[0]), _CHUNK_SIZE):
+		yield from zip(*[ numpy.asarray(x[start:start + _CHUNK_SIZE]).tolist() for x in columns ])
+
+def _join_values(arrays, prefix, basis, model, memo):
+	"""
+	Inverse of `_split_values` for the growth rate dependent values. Return
+	{ entry : coefficient }; the other values are the constants in
+	arrays[prefix + '_const']. Equal coefficients are built and interned once.
+	"""
+	const = arrays[prefix + '_const']
+
+	def build(idx, lst):
+		key = (float(const[idx]), tuple(sorted(lst)))
+		if key not in memo:
+			expr = sympy.Add(*[ basis[bidx] if coeff == 1. else sympy.Float(coeff) * basis[bidx] for bidx, coeff in key[1] ])
+			if key[0] != 0:
+				expr = expr + sympy.Float(key[0])
+			memo[key] = model._intern(expr)
+		return memo[key]
+
+	# triplets are saved in the order of their entries
+	values = {}
+	current, lst = None, []
+	for idx, bidx, coeff in _iter_rows(arrays[prefix + '_term_entry'], arrays[prefix + '_term_basis'], arrays[prefix + '_term_mult']):
+		if idx != current and lst:
+			values[current] = build(current, lst)
+			lst = []
+		current = idx
+		lst.append((bidx, coeff))
+	if lst:
+		values[current] = build(current, lst)
+
+	return values
+
+def save_npz_me_model(model, file_name, compress = False):
+	"""
+	Save a ME-model in the binary columnar format. Loading a model in this
+	format returns a ME-model with the same reactions, stoichiometry and
+	bounds as the one saved, which retains all ME-model functionality.
+	Integer and rational coefficients are saved as floats (e.g., 5*mu is
+	loaded as 5.0*mu).
+
+	Parameters
+	----------
+	model : :class:`coralme.core.model.MEModel`
+		A full ME-model
+
+	file_name : str
+		Filename of the NPZ output
+
+	compress : bool
+		If True, the archive is compressed and cannot be memory-mapped on load
+
+	"""
+	table = model._get_coefficients()
+	split = table.split
+
+	met_index = { met.id:idx for idx, met in enumerate(model.metabolites) }
+
+	rows = []
+	cols = []
+	values = []
+	for col, rxn in enumerate(model.reactions):
+		for met, value in rxn.metabolites.items():
+			rows.append(met_index[met.id])
+			cols.append(col)
+			values.append(value)
+
+	arrays = {
+		'format' : numpy.array([ _FORMAT ]),
+		'version' : numpy.array([ _VERSION ], dtype = numpy.int32),
+		'model' : _to_blob({ 'id' : model.id, 'name' : model.name, 'mu' : str(model.mu) }),
+		'global_info' : _to_blob(coralme.io.dict._get_global_info_dict(model.global_info)),
+		'metabolite_id' : numpy.array([ met.id for met in model.metabolites ], dtype = str),
+		'metabolites' : _to_blob(coralme.io.dict._get_attribute_array(model.metabolites, 'metabolite')),
+		'process_data' : _to_blob(coralme.io.dict._get_attribute_array(model.process_data, 'process_data')),
+		'S_row' : numpy.array(rows, dtype = numpy.int32),
+		'S_col' : numpy.array(cols, dtype = numpy.int32),
+		}
+
+	for key, value in _split_values(values, split).items():
+		arrays['S_' + key] = value
+	for key, value in _split_values([ rxn.lower_bound for rxn in model.reactions ], split).items():
+		arrays['lb_' + key] = value
+	for key, value in _split_values([ rxn.upper_bound for rxn in model.reactions ], split).items():
+		arrays['ub_' + key] = value
+
+	# typed columns of reactions
+	reaction_types = sorted(set([ rxn.__class__.__name__ for rxn in model.reactions ]))
+	type_index = { x:idx for idx, x in enumerate(reaction_types) }
+	arrays['reaction_types'] = numpy.array(reaction_types, dtype = str)
+	arrays['reaction_type'] = numpy.array([ type_index[rxn.__class__.__name__] for rxn in model.reactions ], dtype = numpy.int16)
+	arrays['reaction_id'] = numpy.array([ rxn.id for rxn in model.reactions ], dtype = str)
+	arrays['reaction_name'] = numpy.array([ str(rxn.name) for rxn in model.reactions ], dtype = str)
+	arrays['reaction_subsystem'] = numpy.array([ str(rxn.subsystem) for rxn in model.reactions ], dtype = str)
+	arrays['objective_coefficient'] = numpy.array([ rxn.objective_coefficient for rxn in model.reactions ], dtype = float)
+	arrays['reaction_attributes'] = _to_blob([
+		{
+			attribute:coralme.io.dict._fix_type(getattr(rxn, attribute))
+			for attribute in coralme.io.dict._REACTION_TYPE_DEPENDENCIES.get(rxn.__class__.__name__, [])
+			}
+		for rxn in model.reactions ])
+
+	# basis functions are saved last, splitting values can intern new ones
+	# srepr keeps the full precision of floats
+	arrays['basis'] = numpy.array([ sympy.srepr(fn) for fn in table.basis ], dtype = str)
+
+	with open(file_name, 'wb') as outfile:
+		if compress:
+			numpy.savez_compressed(outfile, **arrays)
+		else:
+			numpy.savez(outfile, **arrays)
+
+def _memmap_npz(file_name):
+	"""
+	Return a dictionary of { member name : array } of an NPZ archive. Members
+	stored without compression are memory-mapped; the others are read.
+	"""
+	arrays = {}
+	npz = numpy.load(file_name, mmap_mode = 'r')
+	with zipfile.ZipFile(file_name) as archive, open(file_name, 'rb') as infile:
+		for info in archive.infolist():
+			key = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+			if info.compress_type != zipfile.ZIP_STORED:
+				arrays[key] = npz[key]
+				continue
+
+			# local file header: 30 bytes, name and extra field
+			infile.seek(info.header_offset + 26)
+			name_length, extra_length = numpy.frombuffer(infile.read(4), dtype = '<u2').tolist()
+			infile.seek(info.header_offset + 30 + name_length + extra_length)
+
+			version = numpy.lib.format.read_magic(infile)
+			if version == (1, 0):
+				shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(infile)
+			else:
+				shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(infile)
+
+			if dtype.hasobject or numpy.prod(shape) == 0:
+				arrays[key] = npz[key]
+			else:
+				arrays[key] = numpy.memmap(
+					file_name, dtype = dtype, mode = 'r', offset = infile.tell(),
+					shape = shape, order = 'F' if fortran_order else 'C')
+	npz.close()
+	return arrays
+
+def load_npz_me_model(file_name):
+	"""
+	Load a ME-model saved in the binary columnar format. Loading a model in
+	this format will return a ME-model with the same reactions,
+	stoichiometry and bounds as the one saved, which retains all ME-model
+	functionality. Coefficients are rebuilt with float numbers (e.g., 5*mu
+	is loaded as 5.0*mu, and 1 as 1.0).
+
+	The stoichiometry and bounds of reactions are set from the archive.
+	Reactions are not updated; call `model.update()` to recompute them from
+	the process data.
+
+	Parameters
+	----------
+	file_name : str
+		Filename of the NPZ archive
+
+	Returns
+	-------
+	:class:`coralme.core.model.MEModel`
+		A full ME-model
+
+	"""
+	arrays = _memmap_npz(file_name)
+
+	if str(arrays['format'][0]) != _FORMAT:
+		raise ValueError('\'{:s}\' is not a ME-model NPZ archive.'.format(str(file_name)))
+	if int(arrays['version'][0]) > _VERSION:
+		raise ValueError('The ME-model NPZ archive has version {:d}, but only versions up to {:d} are supported.'.format(int(arrays['version'][0]), _VERSION))
+
+	info = _from_blob(arrays['model'])
+	model = coralme.core.model.MEModel(mu = info['mu'])
+	model.id = info['id']
+	model.name = info['name']
+	model.global_info = _from_blob(arrays['global_info'])
+	if 'growth_key' in model.global_info:
+		model.global_info['growth_key'] = sympy.Symbol(model.global_info['growth_key'], positive = True)
+
+	for metabolite in tqdm.tqdm(_from_blob(arrays['metabolites']), 'Adding Metabolites into the ME-model...', bar_format = bar_format):
+		coralme.io.dict._add_metabolite_from_dict(model, metabolite)
+
+	for process_data in tqdm.tqdm(_from_blob(arrays['process_data']), 'Adding ProcessData into the ME-model...', bar_format = bar_format):
+		coralme.io.dict._add_process_data_from_dict(model, process_data)
+
+	# basis functions use the symbol of the ME-model (same name and assumptions)
+	basis = [ sympy.sympify(x) for x in arrays['basis'].tolist() ]
+	memo = {}
+	lb = _join_values(arrays, 'lb', basis, model, memo)
+	ub = _join_values(arrays, 'ub', basis, model, memo)
+	values = _join_values(arrays, 'S', basis, model, memo)
+
+	# reactions; some reactions are created with the ME-model or the process data
+	reaction_types = arrays['reaction_types'].tolist()
+	reactions = []
+	new_reactions = []
+	for rxn_id, rxn_type, name, subsystem, coeff in _iter_rows(
+		arrays['reaction_id'], arrays['reaction_type'], arrays['reaction_name'],
+		arrays['reaction_subsystem'], arrays['objective_coefficient']):
+		if model.reactions.has_id(rxn_id):
+			rxn = model.reactions.get_by_id(rxn_id)
+		else:
+			rxn = getattr(coralme.core.reaction, reaction_types[rxn_type])(rxn_id)
+			new_reactions.append(rxn)
+		rxn.name = name
+		rxn.subsystem = subsystem
+		rxn.objective_coefficient = coeff
+		reactions.append(rxn)
+	model.add_reactions(new_reactions)
+
+	# entries of the stoichiometric matrix are saved by column
+	metabolites = [ model.metabolites.get_by_id(x) for x, in _iter_rows(arrays['metabolite_id']) ]
+	S_row, S_const = arrays['S_row'], arrays['S_const']
+	columns = numpy.searchsorted(arrays['S_col'], numpy.arange(len(reactions) + 1)).tolist()
+
+	attributes = _from_blob(arrays['reaction_attributes'])
+	rows = _iter_rows(arrays['lb_const'], arrays['ub_const'])
+	for idx, rxn in enumerate(tqdm.tqdm(reactions, 'Adding Reactions into the ME-model...', bar_format = bar_format)):
+		for attribute, value in attributes[idx].items():
+			# Spontaneous reactions do no require complex_data
+			if attribute == 'complex_data' and 'SPONT' in rxn.id:
+				continue
+			setattr(rxn, attribute, value)
+
+		lb_const, ub_const = next(rows)
+		rxn.bounds = (lb.get(idx, lb_const), ub.get(idx, ub_const))
+
+		start, end = columns[idx], columns[idx + 1]
+		stoichiometry = {
+			metabolites[row]:values.get(entry, value)
+			for entry, row, value in zip(range(start, end), S_row[start:end].tolist(), S_const[start:end].tolist())
+			}
+		if rxn._metabolites:
+			rxn.clear_metabolites()
+		rxn.add_metabolites(stoichiometry, combine = False)
+
+	coralme.builder.compartments.add_compartments_to_model(model)
+
+	return model
@@ -1,11 +1,14 @@
 #!/usr/bin/python3
 
 import copy
+import pickle
+import multiprocessing
 import numpy
 import scipy
 import sympy
 
 from coralme.solver import qwarmLP, warmLP, qvaryME
+from coralme.solver.template import GrowthRateTemplate, MatrixTemplate
 
 def makeME_VA(S, b, c, xl, xu, csense, obj_inds, obj_coeffs):
     """
@@ -46,7 +49,6 @@ def makeME_LP(S, b, c, xl, xu, csense):
     J = scipy.sparse.vstack((S, c), dtype = float).tocsc()
     J.sort_indices()
 
-    b2 = b + [0.0]
     m, n = J.shape
     ne = J.nnz
     # Finally, make the P, I, J, V, as well
@@ -57,11 +59,24 @@ def makeME_LP(S, b, c, xl, xu, csense):
     # Just change to 1-based indexing for Fortran
     P = [ pi+1 for pi in J.indptr ]
 
+    bl, bu = makeME_bounds(b, xl, xu, csense)
+
+    return J, ne, P, I, V, bl, bu
+
+def makeME_bounds(b, xl, xu, csense):
+    """
+    Create primal and slack bounds for qMINOS and MINOS.
+    The last slack corresponds to the objective row and has free bounds.
+    """
+
+    b2 = list(b) + [0.0]
+    m = len(b2)
+
     # Make primal and slack bounds
     bigbnd = 1e+40
     # For csense==E rows (equality)
-    sl = [ bi for bi in b2 ]
-    su = [ bi for bi in b2 ]
+    sl = numpy.array(b2, dtype = float)
+    su = numpy.array(b2, dtype = float)
 
     # It can be avoided since csense contains always 'E'
     for row, csen in enumerate(csense):
@@ -74,10 +89,83 @@ def makeME_LP(S, b, c, xl, xu, csense):
     sl[m - 1] = -bigbnd
     su[m - 1] = +bigbnd
 
-    bl = scipy.vstack([ numpy.matrix(xl).transpose(), numpy.matrix(sl).transpose() ])
-    bu = scipy.vstack([ numpy.matrix(xu).transpose(), numpy.matrix(su).transpose() ])
+    bl = numpy.concatenate([ numpy.asarray(xl, dtype = float), sl ]).reshape(-1, 1)
+    bu = numpy.concatenate([ numpy.asarray(xu, dtype = float), su ]).reshape(-1, 1)
 
-    return J, ne, P, I, V, bl, bu
+    return bl, bu
+
+def _get_pool(processes, initializer, initargs):
+    """
+    Return a multiprocessing.Pool whose workers call initializer(*initargs).
+
+    With the fork start method, workers inherit initargs. With spawn or
+    forkserver (the defaults on macOS and Windows), initargs are pickled, and
+    a RuntimeError is raised if they cannot be (e.g., bounds given as lambda
+    functions).
+    """
+    method = multiprocessing.get_start_method()
+    if method != 'fork':
+        try:
+            pickle.dumps(initargs)
+        except Exception as e:
+            raise RuntimeError('The problem cannot be sent to worker processes with the \'{:s}\' start method ({:s}). Use processes = 1, or multiprocessing.set_start_method(\'fork\') where available.'.format(method, str(e)))
+    return multiprocessing.Pool(processes = processes, initializer = initializer, initargs = initargs)
+
+# Worker state for parallel evaluation of growth rates. One ME_NLP (one qMINOS instance) per process
+_me_nlp = None
+
+def _init_worker(me_nlp):
+    global _me_nlp
+    _me_nlp = me_nlp
+
+def _solvelp_worker(args):
+    muf, basis, precision = args
+    if basis is not None:
+        basis = basis.copy()
+    return _me_nlp.solvelp(muf, basis, precision)
+
+def _varyme_worker(args):
+    mu_fixed, obj_inds0, obj_coeffs, basis = args
+    if basis is not None:
+        basis = basis.copy()
+    return _me_nlp.varyme(mu_fixed, obj_inds0, obj_coeffs, basis = basis)
+
+# Worker state for sweeps of conditions. The last optimal basis of each worker warm-starts its next condition
+_sweep_basis = None
+
+def _init_sweep_worker(me_nlp, basis):
+    global _me_nlp, _sweep_basis
+    _me_nlp = me_nlp
+    _sweep_basis = basis
+
+def _sweep_worker(args):
+    global _sweep_basis
+    name, indices, lb, ub, mumin, mumax, maxIter, tolerance, precision = args
+
+    basis = None if _sweep_basis is None else _sweep_basis.copy()
+    _me_nlp.set_bounds(indices, lb, ub)
+    try:
+        muopt, xopt, yopt, zopt, basis, stat = _me_nlp.bisectmu(
+            mumin = mumin, mumax = mumax, maxIter = maxIter, basis = basis,
+            tolerance = tolerance, precision = precision, verbose = False)
+    finally:
+        _me_nlp.reset_bounds(indices)
+
+    if stat == 'optimal':
+        _sweep_basis = basis
+    return name, muopt, xopt, yopt, zopt, basis, stat
+
+def _feasibility_worker(args):
+    # close or change the bounds of a few columns and test the feasibility at mu = muf
+    indices, lb, ub, muf, precision = args
+
+    basis = None if _sweep_basis is None else _sweep_basis.copy()
+    _me_nlp.set_bounds(indices, lb, ub)
+    try:
+        x, pi, rc, stat, hs = _me_nlp.solvelp(muf, basis, precision)
+    finally:
+        _me_nlp.reset_bounds(indices)
+    return stat == 'optimal'
 
 # Modified from solvemepy.me2
 class ME_NLP:
@@ -116,6 +204,13 @@ class ME_NLP:
         self.N     = None
         self.nb    = None
 
+        # Compiled J = [S; c] matrix and bounds, evaluated at each trial mu
+        self._template = None
+        self._bl_template = None
+        self._bu_template = None
+        self._bl_lambdas = None
+        self._bu_lambdas = None
+
         # Solution and exit flag
         self.x      = None
         self.inform = numpy.array(0)
@@ -128,6 +223,12 @@ class ME_NLP:
         # Initialize solver options
         self.init_solver_opts()
 
+    def __getstate__(self):
+        # lambda functions cannot be pickled; the compiled template does not need them
+        state = self.__dict__.copy()
+        state['fn'] = None
+        return state
+
     def init_solver_opts(self):
         #----------------------------------------------------
         # Solver options
@@ -271,44 +372,132 @@ class ME_NLP:
 
         return stropts, intopts, realopts, intvals, realvals, nStrOpts, nIntOpts, nRealOpts
 
-    def make_lp(self, muf, obj_inds0 = None, obj_coeffs = None):
+    def make_template(self, c):
         """
-        Construct LP problem for qMINOS or MINOS.
+        Compile J = [S; c] into a MatrixTemplate. qMINOS requires an extra row
+        holding the objective, so c is added as the last row of J.
         """
 
-        # self.mu is a set of sympy Symbols
-        dct = { symbol:muf for symbol in self.mu }
+        entries = dict(self.Sf)
+        entries.update(self.Se)
 
-        if self.fn is None:
-            xl = [ float(x.xreplace(dct)) if hasattr(x, 'subs') else x for x in self.xl ]
-            xu = [ float(x.xreplace(dct)) if hasattr(x, 'subs') else x for x in self.xu ]
-            Se = { k:float(x.xreplace(dct)) if hasattr(x, 'subs') else x for k,x in self.Se.items() }
-            self.Sf.update(Se)
-        else:
-            xl = [ fn(*[muf]*len(dct)) for fn in self.xl ]
-            xu = [ fn(*[muf]*len(dct)) for fn in self.xu ]
-            Se = { k:fn(*[muf]*len(dct)) for k,fn in self.fn.items() }
-            self.Sf.update(Se)
+        m = len(self.b)
+        for j, cj in enumerate(c):
+            if cj != 0:
+                entries[m, j] = float(cj)
+
+        return MatrixTemplate(entries, (m + 1, len(c)), self.mu)
+
+    @property
+    def template(self):
+        if self._template is None:
+            self._template = self.make_template(self.c)
+        return self._template
+
+    def make_bounds_template(self, x, csense_bound):
+        """
+        Compile primal and slack bounds into a GrowthRateTemplate.
+        Bounds given as lambda functions are evaluated on each call instead.
+        """
+
+        lambdas = [ (idx, fn) for idx, fn in enumerate(x) if hasattr(fn, '__call__') ]
+        values = [ 0. if hasattr(v, '__call__') else v for v in x ] + list(csense_bound)
+        return GrowthRateTemplate(values, self.mu), lambdas
+
+    def init_lp(self):
+        """
+        Build the sparsity pattern of J, 1-based indices and bounds once.
+        Later calls to make_lp only patch the values depending on mu.
+        """
+
+        template = self.template
+        self.J = scipy.sparse.csc_matrix((template.data, template.indices, template.indptr), shape = template.shape, copy = False)
+        self.M, self.N = template.shape
+        self.ne = template.nnz
+        self.nb = self.M + self.N
+
+        # Row indices and pointers to start of each column: recall fortran is 1-based indexing
+        self.ha = template.indices + 1
+        self.ka = template.indptr + 1
+        self.ad = template.data
+
+        # Slack bounds do not depend on mu
+        sl, su = makeME_bounds(self.b, [], [], self.cs)
+        self._bl_template, self._bl_lambdas = self.make_bounds_template(self.xl, sl.flat)
+        self._bu_template, self._bu_lambdas = self.make_bounds_template(self.xu, su.flat)
+        self.bld = self._bl_template.const.copy()
+        self.bud = self._bu_template.const.copy()
+
+    def set_bounds(self, indices, lb, ub):
+        """
+        Patch the compiled bounds of the columns in `indices` with new lower
+        and upper bounds (floats, sympy expressions or lambda functions).
+        The original bounds are restored with `reset_bounds`.
+        """
+
+        if self.J is None:
+            self.init_lp()
+
+        indices = [ int(idx) for idx in indices ]
+        patched = set(indices)
+        for template, lambdas, values in [ (self._bl_template, self._bl_lambdas, lb), (self._bu_template, self._bu_lambdas, ub) ]:
+            lambdas[:] = [ (idx, fn) for idx, fn in lambdas if idx not in patched ]
+            lambdas.extend([ (idx, fn) for idx, fn in zip(indices, values) if hasattr(fn, '__call__') ])
+            template.set_values(indices, [ 0. if hasattr(v, '__call__') else v for v in values ])
+
+    def reset_bounds(self, indices):
+        """
+        Restore the original bounds of the columns in `indices`.
+        """
+
+        self.set_bounds(indices, [ self.xl[idx] for idx in indices ], [ self.xu[idx] for idx in indices ])
+
+    def update_lp(self, muf):
+        """
+        Write the values of J and bounds at mu = muf into the cached buffers.
+        """
+
+        if self.J is None:
+            self.init_lp()
 
-        Sp = scipy.sparse.dok_matrix((len(self.b), len(self.c)), dtype = float)
-        for idx, idj in self.Sf.keys():
-            Sp[idx, idj] = self.Sf[idx, idj]
+        self.template.evaluate(muf, out = self.ad)
+        self._bl_template.evaluate(muf, out = self.bld)
+        self._bu_template.evaluate(muf, out = self.bud)
+
+        nsymbols = len(self.mu)
+        for idx, fn in self._bl_lambdas:
+            self.bld[idx] = fn(*[muf]*nsymbols)
+        for idx, fn in self._bu_lambdas:
+            self.bud[idx] = fn(*[muf]*nsymbols)
+
+    def make_lp(self, muf, obj_inds0 = None, obj_coeffs = None):
+        """
+        Construct LP problem for qMINOS or MINOS.
+        """
+
+        self.update_lp(muf)
 
         if obj_inds0 and obj_coeffs:
-            J, ne, P, I, V, bl, bu, obj_inds = makeME_VA(Sp, self.b, self.c, xl, xu, self.cs, obj_inds0, obj_coeffs)
+            # Put ANY non-zero for all columns that will be min/maxed
+            columns = sorted(set(obj_inds0))
+            template = self.template.replace_row(self.M - 1, columns, [ 1.0 for j in columns ])
+            template.evaluate(muf, out = template.data)
+            ha = template.indices + 1
+            ka = template.indptr + 1
+            ad = template.data
+            # Just change to 1-based indexing for Fortran
+            obj_inds = [ i+1 for i in obj_inds0 ]
         else:
-            J, ne, P, I, V, bl, bu           = makeME_LP(Sp, self.b, self.c, xl, xu, self.cs)
+            ha = self.ha
+            ka = self.ka
+            ad = self.ad
             obj_inds = None
 
         # Solve a single LP
-        m, n = J.shape
-        ha = I
-        ka = P
-        ad = V
-        bld = [ bi for bi in bl.flat ]
-        bud = [ bi for bi in bu.flat ]
-        nb = m + n
-        hs = numpy.zeros(nb, numpy.dtype('i4'))
+        m, n = self.M, self.N
+        bld = self.bld
+        bud = self.bud
+        hs = numpy.zeros(self.nb, numpy.dtype('i4'))
 
         return m, n, ha, ka, ad, bld, bud, hs, obj_inds
 
@@ -463,6 +652,79 @@ class ME_NLP:
 
             return muf, x_new, y_new, z_new, basis, stat_new
 
+    def ksectmu(
+        self, mumin = 0.0, mumax = 2.0, k = 4, maxIter = 100, basis = None,
+        tolerance = 1e-6, precision = 'quad', verbose = False
+        ):
+        """
+        muopt, xopt, yopt, zopt, basis, stat = ksectmu(
+            self, mumin = 0.0, mumax = 2.0, k = 4, maxIter = 100,
+            tolerance = 1e-6, precision = 'quad', verbose = False
+            )
+
+        K-section to maximize the growth rate using qMINOS.
+        Each round evaluates k growth rates at once in a process pool, one
+        qMINOS instance per worker, and the interval shrinks by a factor of k+1.
+        The optimal basis of the largest feasible growth rate is passed to
+        the next round for warm-start.
+        """
+
+        k = int(k) if int(k) >= 1 else 1
+
+        def get_stat_msg(stat):
+            if stat == "optimal":
+                return "Optimal"
+            if stat == 1:
+                return "Not feasible"
+            return str(stat)
+
+        if verbose:
+            print('Iteration\t Solution to check\tSolver Status')
+            print('---------\t------------------\t-------------')
+
+        # compile J and bounds once, workers receive them with the ME_NLP
+        self.update_lp(mumax)
+
+        # test mumax
+        x_new, y_new, z_new, stat_new, hs_new = self.solvelp(mumax, basis, precision)
+        if verbose:
+            print('{:s}\t{:.16f}\t{:s}'.format(str(0).rjust(9), mumax, get_stat_msg(stat_new)))
+        if stat_new == 'optimal':
+            return mumax, x_new, y_new, z_new, hs_new, stat_new
+
+        last = [mumax, x_new, y_new, z_new, hs_new, stat_new]
+        best = None
+        with _get_pool(k, _init_worker, (self,)) as pool:
+            for idx in range(1, maxIter + 1):
+                # Just a sequence of feasibility checks, k at once
+                step = (mumax - mumin) / (k + 1)
+                mus = [ mumin + step * (jdx + 1) for jdx in range(k) ]
+                res = pool.map(_solvelp_worker, [ (muf, basis, precision) for muf in mus ])
+
+                for muf, (x_new, y_new, z_new, stat_new, hs_new) in zip(mus, res):
+                    last = [muf, x_new, y_new, z_new, hs_new, stat_new]
+                    if verbose:
+                        print('{:s}\t{:.16f}\t{:s}'.format(str(idx).rjust(9), muf, get_stat_msg(stat_new)))
+
+                # feasibility is monotone in mu: keep the largest feasible growth rate
+                feasible = [ jdx for jdx, x in enumerate(res) if x[3] == 'optimal' ]
+                if len(feasible) != 0:
+                    jdx = feasible[-1]
+                    x_new, y_new, z_new, stat_new, hs_new = res[jdx]
+                    best = [mus[jdx], x_new, y_new, z_new, hs_new, stat_new]
+                    basis = hs_new
+                    mumin = mus[jdx]
+                    mumax = mus[jdx + 1] if jdx + 1 < k else mumax
+                else:
+                    mumax = mus[0]
+
+                if abs(mumax - mumin) <= tolerance or mumax <= tolerance:
+                    break
+
+        if best is not None:
+            return best
+        return last # stat_new is not optimal
+
     def varyme(self, mu_fixed, obj_inds0, obj_coeffs, basis = None, verbosity = False):
         """
         fva_result, fva_stats = varyme(self, mu_fixed, obj_inds0, obj_coeffs)
@@ -0,0 +1,209 @@
+#!/usr/bin/python3
+
+import numpy
+import scipy
+import sympy
+
+def split_coefficient(value):
+    """
+    Split a stoichiometric coefficient or bound into its constant part and
+    a dictionary of { basis function of mu : float multiplier }.
+
+    Coefficients of ME-models are sums of terms like mu/(keff*3600) or
+    mu*c/(mu+kt*r0). Each term is a float multiplier times a basis function
+    of mu, and only a few basis functions are different across the model.
+    """
+    if not hasattr(value, 'free_symbols') or len(value.free_symbols) == 0:
+        return float(value), {}
+
+    const = 0.
+    terms = {}
+    for basis, coeff in value.as_coefficients_dict().items():
+        if len(basis.free_symbols) == 0:
+            const += float(coeff * basis)
+        else:
+            terms[basis] = terms.get(basis, 0.) + float(coeff)
+    return const, terms
+
+class GrowthRateTemplate:
+    """
+    Compiled array of values that depend on the growth rate.
+
+    Constant values are stored once. The mu-dependent values are stored as
+    (position, basis function index, multiplier) triplets, and the unique
+    basis functions are lambdified once as a single function. Evaluating the
+    template at a new mu is a single vectorized kernel over the triplets.
+
+    values: list of floats or sympy expressions, in the order of the output
+    atoms: set of sympy Symbols to be replaced by mu
+    split: function splitting the values, see `split_coefficient`
+    """
+    # templates saved before `split` was stored
+    split = staticmethod(split_coefficient)
+
+    def __init__(self, values, atoms, split = split_coefficient):
+        self.atoms = list(atoms)
+        self.split = split
+        self.const = numpy.zeros(len(values), dtype = float)
+
+        pos = []
+        bidx = []
+        coeff = []
+        basis = {}
+        for idx, value in enumerate(values):
+            const, terms = split(value)
+            self.const[idx] = const
+            for fn, mult in terms.items():
+                pos.append(idx)
+                bidx.append(basis.setdefault(fn, len(basis)))
+                coeff.append(mult)
+
+        self.basis = list(basis.keys())
+        self.pos = numpy.array(pos, dtype = numpy.int64)
+        self.bidx = numpy.array(bidx, dtype = numpy.int64)
+        self.coeff = numpy.array(coeff, dtype = float)
+        self._fn = None
+
+    def __len__(self):
+        return len(self.const)
+
+    def __getstate__(self):
+        # lambdified functions cannot be pickled, compile again after loading
+        state = self.__dict__.copy()
+        state['_fn'] = None
+        return state
+
+    @property
+    def is_constant(self):
+        return len(self.pos) == 0
+
+    def set_values(self, indices, values):
+        """
+        Replace the values at positions `indices` and keep the rest of the
+        compiled template untouched.
+        """
+        indices = numpy.asarray(indices, dtype = numpy.int64)
+        keep = ~numpy.isin(self.pos, indices)
+
+        pos = []
+        bidx = []
+        coeff = []
+        basis = { fn:idx for idx, fn in enumerate(self.basis) }
+        nbasis = len(basis)
+        for idx, value in zip(indices, values):
+            const, terms = self.split(value)
+            self.const[idx] = const
+            for fn, mult in terms.items():
+                pos.append(idx)
+                bidx.append(basis.setdefault(fn, len(basis)))
+                coeff.append(mult)
+
+        self.pos = numpy.concatenate([ self.pos[keep], numpy.array(pos, dtype = numpy.int64) ])
+        self.bidx = numpy.concatenate([ self.bidx[keep], numpy.array(bidx, dtype = numpy.int64) ])
+        self.coeff = numpy.concatenate([ self.coeff[keep], numpy.array(coeff, dtype = float) ])
+
+        if len(basis) != nbasis:
+            self.basis = list(basis.keys())
+            self._fn = None
+
+    def evaluate_basis(self, muf):
+        """
+        Return the values of the unique basis functions at mu = muf
+        """
+        if self._fn is None:
+            self._fn = sympy.lambdify(self.atoms, self.basis, 'numpy')
+        return numpy.array(self._fn(*[muf]*len(self.atoms)), dtype = float)
+
+    def evaluate(self, muf, out = None):
+        """
+        Write the values at mu = muf into `out` (or a new array) and return it
+        """
+        if out is None:
+            out = numpy.empty(len(self.const), dtype = float)
+        out[:] = self.const
+        if len(self.pos) != 0:
+            numpy.add.at(out, self.pos, self.coeff * self.evaluate_basis(muf)[self.bidx])
+        return out
+
+class MatrixTemplate(GrowthRateTemplate):
+    """
+    Compiled CSC matrix whose values depend on the growth rate.
+
+    The sparsity pattern (indptr and indices) is fixed at construction. The
+    `data` buffer of the CSC matrix is overwritten in place by `evaluate`.
+
+    entries: dictionary of { (row, column) : float or sympy expression }
+    shape: tuple with the number of rows and columns
+    atoms: set of sympy Symbols to be replaced by mu
+    split: function splitting the values, see `split_coefficient`
+    """
+    def __init__(self, entries, shape, atoms, split = split_coefficient):
+        # drop explicit zeros as scipy.sparse.dok_matrix did
+        entries = { k:v for k,v in entries.items() if hasattr(v, 'free_symbols') or v != 0 }
+
+        m, n = shape
+        keys = list(entries.keys())
+        rows = numpy.array([ k[0] for k in keys ], dtype = numpy.int64)
+        cols = numpy.array([ k[1] for k in keys ], dtype = numpy.int64)
+        # sort by column, then by row (CSC order with sorted indices)
+        order = numpy.lexsort((rows, cols))
+        values = [ entries[keys[k]] for k in order ]
+
+        GrowthRateTemplate.__init__(self, values, atoms, split = split)
+
+        self.shape = (m, n)
+        self.indices = rows[order].astype(numpy.int32)
+        self.indptr = numpy.zeros(n + 1, dtype = numpy.int32)
+        numpy.cumsum(numpy.bincount(cols, minlength = n), out = self.indptr[1:])
+        self.data = self.const.copy()
+
+    @property
+    def nnz(self):
+        return len(self.const)
+
+    def replace_row(self, row, columns, values):
+        """
+        Return a new template where the entries of `row` are replaced by
+        constant `values` at `columns`. The rest of the compiled template is
+        reused without evaluating any expression again.
+        """
+        m, n = self.shape
+        rows = self.indices.astype(numpy.int64)
+        cols = numpy.repeat(numpy.arange(n, dtype = numpy.int64), numpy.diff(self.indptr))
+        keep = rows != row
+
+        new_rows = numpy.concatenate([ rows[keep], numpy.full(len(columns), row, dtype = numpy.int64) ])
+        new_cols = numpy.concatenate([ cols[keep], numpy.asarray(columns, dtype = numpy.int64) ])
+        const = numpy.concatenate([ self.const[keep], numpy.asarray(values, dtype = float) ])
+
+        # sort by column, then by row; rank maps unsorted to sorted positions
+        order = numpy.lexsort((new_rows, new_cols))
+        rank = numpy.empty(len(order), dtype = numpy.int64)
+        rank[order] = numpy.arange(len(order), dtype = numpy.int64)
+        kept = numpy.cumsum(keep) - 1
+
+        new = object.__new__(self.__class__)
+        new.atoms = self.atoms
+        new.basis = self.basis
+        new.split = self.split
+        new._fn = self._fn
+        new.const = const[order]
+        triplets = keep[self.pos]
+        new.pos = rank[kept[self.pos[triplets]]]
+        new.bidx = self.bidx[triplets]
+        new.coeff = self.coeff[triplets]
+        new.shape = self.shape
+        new.indices = new_rows[order].astype(numpy.int32)
+        new.indptr = numpy.zeros(n + 1, dtype = numpy.int32)
+        numpy.cumsum(numpy.bincount(new_cols, minlength = n), out = new.indptr[1:])
+        new.data = new.const.copy()
+        return new
+
+    def tocsc(self, muf, copy = False):
+        """
+        Return the CSC matrix at mu = muf. The matrix shares the `data` buffer
+        of the template, unless copy is True.
+        """
+        self.evaluate(muf, out = self.data)
+        data = self.data.copy() if copy else self.data
+        return scipy.sparse.csc_matrix((data, self.indices, self.indptr), shape = self.shape, copy = False)
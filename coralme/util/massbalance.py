@@ -19,6 +19,8 @@ def eval_reaction_at_growth_rate(reaction, growth_rate):
 			reaction._metabolites[key] = 0.
 		if isinstance(reaction, coralme.TranscriptionReaction) and isinstance(key, coralme.RNAP):
 			reaction._metabolites[key] = 0.
+	if hasattr(reaction, '_mark_lp_dirty'):
+		reaction._mark_lp_dirty()
 	return reaction
 
 def get_elements_from_process_data(reaction, process_data, elements):